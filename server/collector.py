@@ -1,7 +1,7 @@
 import json
 import logging
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 import os
 # Configure basic logging for the module
 logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -24,6 +24,27 @@ class Collector:
             data_store: An instance of the DataStore.
         """
         self.data_store = data_store
+
+        # Dispatch tables: one dict lookup per message instead of a chain of type comparisons.
+        # Handlers for messages carrying a 'values' payload, keyed by raw type
+        self._values_handlers: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+            'android.sensor.pressure': self._handle_pressure_data,
+            'android.sensor.wifi_scan': self._handle_wifi_scan_values,
+            'android.sensor.bluetooth_scan': self._handle_bluetooth_scan_values,
+        }
+        for vector_type in ['android.sensor.accelerometer', 'android.sensor.accelerometer_uncalibrated', 'android.sensor.linear_acceleration', 'android.sensor.gravity', 'android.sensor.magnetic_field', 'android.sensor.magnetic_field_uncalibrated', # Added uncalibrated mag field
+                            'android.sensor.gyroscope', 'android.sensor.gyroscope_uncalibrated',
+                            'android.sensor.rotation_vector', 'android.sensor.game_rotation_vector', 'android.sensor.geomagnetic_rotation_vector',
+                            'android.sensor.orientation']: # Orientation has 3 values like vector
+            self._values_handlers[vector_type] = self._handle_vector_sensor_data
+        for temperature_type in ['com.google.sensor.gyro_temperature', 'com.google.sensor.pressure_temp']:
+            self._values_handlers[temperature_type] = self._handle_temperature_data
+        # Handlers for messages without 'values' (they read fields from the whole raw message)
+        self._structured_handlers: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+            'android.sensor.gps': self._handle_gps_data,
+            'gps': self._handle_gps_data,
+            'android.sensor.touchscreen': self._handle_touch_data, # Touch data might not have 'values'
+        }
         logger.info("Collector initialized.")
 
     def receive_raw_data(self, raw_data: Dict[str, Any], device_identifier: str, device_ip: str) -> None:
@@ -52,43 +73,27 @@ class Collector:
 
         # Dispatch based on type, passing device_ip for logging
         if raw_values is not None:
-            if raw_type == 'android.sensor.pressure':
-                data_points_to_log = self._handle_pressure_data(raw_type, raw_name, raw_values, created_at, device_ip)
-            elif raw_type in ['android.sensor.accelerometer', 'android.sensor.accelerometer_uncalibrated', 'android.sensor.linear_acceleration', 'android.sensor.gravity', 'android.sensor.magnetic_field', 'android.sensor.magnetic_field_uncalibrated']: # Added uncalibrated mag field
-                data_points_to_log = self._handle_vector_sensor_data(raw_type, raw_name, raw_values, created_at, device_ip)
-            elif raw_type in ['android.sensor.gyroscope', 'android.sensor.gyroscope_uncalibrated']:
-                data_points_to_log = self._handle_vector_sensor_data(raw_type, raw_name, raw_values, created_at, device_ip)
-            elif raw_type in ['android.sensor.rotation_vector', 'android.sensor.game_rotation_vector', 'android.sensor.geomagnetic_rotation_vector']:
-                data_points_to_log = self._handle_vector_sensor_data(raw_type, raw_name, raw_values, created_at, device_ip)
-            elif raw_type == 'android.sensor.wifi_scan':
-                data_points_to_log = self._handle_wifi_scan_data(raw_values, created_at, device_ip)
-            elif raw_type == 'android.sensor.bluetooth_scan':
-                data_points_to_log = self._handle_bluetooth_scan_data(raw_values, created_at, device_ip)
-            elif raw_type == 'android.sensor.orientation':
-                data_points_to_log = self._handle_vector_sensor_data(raw_type, raw_name, raw_values, created_at, device_ip) # Orientation has 3 values like vector
-            elif raw_type in ['com.google.sensor.gyro_temperature', 'com.google.sensor.pressure_temp']:
-                data_points_to_log = self._handle_temperature_data(raw_type, raw_name, raw_values, created_at, device_ip)
+            handler = self._values_handlers.get(raw_type)
+            if handler is not None:
+                data_points_to_log = handler(raw_type, raw_name, raw_values, created_at, device_ip)
             else:
                 logger.warning(f"Unsupported raw data type from {device_identifier} ({device_ip}): {raw_type}. Skipping.")
-        
-        elif raw_type in ['android.sensor.gps', 'gps']:
-            data_points_to_log = self._handle_gps_data(raw_type, raw_name, raw_data, created_at, device_ip)
-        
-        elif raw_type == 'android.sensor.touchscreen': # Touch data might not have 'values'
-            data_points_to_log = self._handle_touch_data(raw_type, raw_name, raw_data, created_at, device_ip)
-            
         else:
-            logger.warning(f"Raw data type '{raw_type}' from {device_identifier} ({device_ip}) has unexpected structure. Skipping.")
+            handler = self._structured_handlers.get(raw_type)
+            if handler is not None:
+                data_points_to_log = handler(raw_type, raw_name, raw_data, created_at, device_ip)
+            else:
+                logger.warning(f"Raw data type '{raw_type}' from {device_identifier} ({device_ip}) has unexpected structure. Skipping.")
 
         # Log the data points
         if data_points_to_log:
             logger.debug(f"Converted raw data from {device_identifier} ({device_ip}) to {len(data_points_to_log)} data points.")
-            for dp in data_points_to_log:
-                try:
-                    self.data_store.set(dp, files=['raw_data'])
-                    logger.debug(f"Logged dp from {device_ip}: {dp.get('type')}/{dp.get('key')}")
-                except Exception as e:
-                    logger.error(f"Failed to log data point from {device_ip}: {e}, Data: {dp}", exc_info=True)
+            # Queue the whole burst (e.g. one WiFi scan) with a single DataStore call
+            try:
+                self.data_store.set_many(data_points_to_log, files=['raw_data'])
+                logger.debug(f"Logged {len(data_points_to_log)} dps from {device_ip} of type {raw_type}")
+            except Exception as e:
+                logger.error(f"Failed to log data points from {device_ip}: {e}, Data: {data_points_to_log}", exc_info=True)
         else:
             logger.debug(f"No data points generated from raw data type: {raw_type} from {device_identifier} ({device_ip}).")
 
@@ -131,29 +136,27 @@ class Collector:
         # Log inference result data_points to the DataStore
         if output_data_points:
              logger.debug(f"Converted inference result to {len(output_data_points)} data points for logging.")
-             for dp in output_data_points:
-                 # Determine which files to log this specific data point type to
-                 log_files = ['raw_data'] # Default to raw_data
-                 dp_type = dp.get('type', '')
-                 inference_type = inference_result.get('inference_type', 'unknown_type')
-                 
-                 # Define types that should also go into inference_data.log
-                 inference_log_types = [
-                     f'inference.{inference_type}.prediction',
-                     f'inference.{inference_type}.confidence',
-                     f'inference.{inference_type}.score',
-                     f'inference.{inference_type}.result' # The full structured result
-                 ]
-                 
-                 if dp_type in inference_log_types:
-                     log_files.append('inference_data')
-                     
-                 # Log the data point to the determined files
+             inference_type = inference_result.get('inference_type', 'unknown_type')
+
+             # Define types that should also go into inference_data.log
+             inference_log_types = {
+                 f'inference.{inference_type}.prediction',
+                 f'inference.{inference_type}.confidence',
+                 f'inference.{inference_type}.score',
+                 f'inference.{inference_type}.result' # The full structured result
+             }
+
+             # Group the data points by the files they go to, then log each group with one DataStore call
+             raw_and_inference_points = [dp for dp in output_data_points if dp.get('type', '') in inference_log_types]
+             raw_only_points = [dp for dp in output_data_points if dp.get('type', '') not in inference_log_types]
+             for dps, log_files in ((raw_and_inference_points, ['raw_data', 'inference_data']), (raw_only_points, ['raw_data'])):
+                 if not dps:
+                     continue
                  try:
-                     self.data_store.set(dp, files=list(set(log_files))) # Use set to avoid duplicates
-                     logger.debug(f"Logged inference dp type '{dp_type}' to files: {log_files}")
+                     self.data_store.set_many(dps, files=log_files)
+                     logger.debug(f"Logged {len(dps)} inference dps to files: {log_files}")
                  except Exception as e:
-                     logger.error(f"Failed to log inference data point via DataStore: {e}, Data: {dp}", exc_info=True)
+                     logger.error(f"Failed to log inference data points via DataStore: {e}, Data: {dps}", exc_info=True)
 
         else:
              logger.warning("No data points generated from inference result for logging.")
@@ -374,6 +377,14 @@ class Collector:
             
         return data_points
 
+    def _handle_wifi_scan_values(self, raw_type: str, raw_name: Optional[str], raw_values: Any, created_at: str, device_ip: str) -> List[Dict[str, Any]]:
+        """Dispatch-table adapter for _handle_wifi_scan_data."""
+        return self._handle_wifi_scan_data(raw_values, created_at, device_ip)
+
+    def _handle_bluetooth_scan_values(self, raw_type: str, raw_name: Optional[str], raw_values: Any, created_at: str, device_ip: str) -> List[Dict[str, Any]]:
+        """Dispatch-table adapter for _handle_bluetooth_scan_data."""
+        return self._handle_bluetooth_scan_data(raw_values, created_at, device_ip)
+
     def _handle_wifi_scan_data(self, raw_values: Any, created_at: str, device_ip: str) -> List[Dict[str, Any]]:
         data_points = []
         if not isinstance(raw_values, list):
@@ -1,15 +1,289 @@
+import atexit
+import copy
 import json
+import math
 import os
 import logging
+import mmap
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from concurrent.futures import Future # Resolved once a queued write is persisted
 from datetime import datetime, timezone, timedelta # Import timedelta
-from typing import List, Dict, Any, Optional
-from collections import deque # Added for efficient file reading
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
+from collections import deque, OrderedDict # Added for efficient file reading
 from threading import Lock # Standard threading lock for in-memory structures
+import numpy as np # Sidecar index records are scanned as structured arrays
+from data_store_kernels import select_records as _select_records
 
 # Configure basic logging for the module
 logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Prefer orjson for encoding log lines (C encoder, emits bytes directly); fall back to stdlib json
+try:
+    import orjson
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+# Prefer msgspec for decoding just the filter fields of a log line in get_data(); the full
+# (possibly large, e.g. inference results) data point is only decoded for matching lines
+try:
+    import msgspec
+
+    class _LogLineHeader(msgspec.Struct):
+        """Fields of a stored data point that get_data() filters on; 'value' is required but left undecoded."""
+        created_at: str
+        type: str
+        value: msgspec.Raw
+        key: Any = None
+
+    _header_decoder = msgspec.json.Decoder(_LogLineHeader)
+except ImportError:
+    msgspec = None
+    _header_decoder = None
+
+# fdatasync skips flushing unchanged metadata; not available on every platform (e.g. macOS)
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+def _datetime_us(dt: datetime) -> int:
+    """Microseconds since the Unix epoch; naive datetimes are taken as UTC (as get_data() does)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // _ONE_MICROSECOND
+
+def _copy_data_point(data_point: Dict[str, Any]) -> Dict[str, Any]:
+    """Copies a decoded data point, including any list or dict it holds (e.g. an inference result's value)."""
+    return {field: copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+            for field, value in data_point.items()}
+
+def _is_nested(data_point: Dict[str, Any]) -> bool:
+    """Whether a decoded data point holds a list or dict, which a plain dict.copy() would share."""
+    return any(isinstance(value, (list, dict)) for value in data_point.values())
+
+class _LogIndex:
+    """
+    Sidecar index of one append-only log file, stored next to it as '<log>.idx' (+ '<log>.idx.types').
+
+    Every line of the log gets one fixed-size record (created_at in epoch microseconds, byte offset,
+    length, type id), so get_data() can select the lines of a type/time window with vectorized
+    comparisons and decode only those, instead of parsing every line of the file. Type ids index
+    the '.types' file, which holds one JSON-encoded type per line in id order.
+
+    Lines without a valid type or created_at get UNKNOWN_TYPE_ID / NO_TIMESTAMP and never match:
+    get_data() skips them anyway. The index is only a prefilter; matched lines still go through the
+    same checks as a full scan.
+
+    Lines appended by anything other than this DataStore are picked up by catch_up(), which indexes
+    whatever the log holds past the last indexed byte. A missing, corrupt or stale index (e.g. the log
+    was truncated or replaced) is rebuilt from the log. All methods must be called with lock held.
+    """
+
+    RECORD_DTYPE = np.dtype([('ts', '<i8'), ('offset', '<u8'), ('length', '<u4'), ('type_id', '<u4')])
+    UNKNOWN_TYPE_ID = np.iinfo(np.uint32).max
+    NO_TIMESTAMP = np.iinfo(np.int64).min
+    CATCH_UP_CHUNK_SIZE = 1 << 22
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self.index_path = log_path + ".idx"
+        self.types_path = log_path + ".idx.types"
+        self.lock = Lock()
+        self._types: List[str] = []
+        self._type_ids: Dict[str, int] = {}
+        self._record_count = 0
+        self.indexed_size = 0 # Bytes of the log covered by the index
+        self._load()
+
+    def _load(self) -> None:
+        """Loads the index from disk, resetting it if it is missing or does not match the log."""
+        try:
+            with open(self.types_path, 'rb') as f:
+                types = [sys.intern(json.loads(line)) for line in f]
+            records = np.fromfile(self.index_path, dtype=self.RECORD_DTYPE) if os.path.exists(self.index_path) else None
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.index_path) or os.path.exists(self.types_path):
+                logger.warning(f"Could not read log index {self.index_path}: {e}. Rebuilding it.")
+            self.reset()
+            return
+        if records is None:
+            self.reset()
+            return
+        # A torn final record (e.g. after a crash) is dropped; its line is re-indexed by catch_up()
+        if os.path.getsize(self.index_path) != records.nbytes:
+            os.truncate(self.index_path, records.nbytes)
+        indexed_size = int(records['offset'][-1]) + int(records['length'][-1]) if len(records) else 0
+        known = records['type_id'] != self.UNKNOWN_TYPE_ID
+        if (indexed_size > self._log_size()
+                or (known.any() and int(records['type_id'][known].max()) >= len(types))):
+            logger.warning(f"Log index {self.index_path} does not match {self.log_path}. Rebuilding it.")
+            self.reset()
+            return
+        self._types = types
+        self._type_ids = {data_point_type: type_id for type_id, data_point_type in enumerate(types)}
+        self._record_count = len(records)
+        self.indexed_size = indexed_size
+
+    def reset(self) -> None:
+        """Empties the index; catch_up() then rebuilds it from the whole log."""
+        for path in (self.index_path, self.types_path):
+            with open(path, 'wb'):
+                pass
+        self._types = []
+        self._type_ids = {}
+        self._record_count = 0
+        self.indexed_size = 0
+
+    def _log_size(self) -> int:
+        try:
+            return os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+
+    def catch_up(self, seal_torn_tail: bool = False) -> None:
+        """
+        Indexes the complete lines appended to the log since it was last indexed.
+
+        An incomplete last line is normally left for a later call (its writer may still be appending).
+        With seal_torn_tail, which the writer passes before appending, it is a torn line (e.g. from a
+        crash mid-write): it is terminated with a newline and indexed as an unreadable line, so the
+        next append starts a line of its own at indexed_size.
+        """
+        log_size = self._log_size()
+        if log_size < self.indexed_size:
+            logger.warning(f"{self.log_path} shrank below its indexed size. Rebuilding log index.")
+            self.reset()
+        if log_size == self.indexed_size:
+            return
+        if self.indexed_size == 0:
+            logger.info(f"Building log index for {self.log_path} ({log_size} bytes)")
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.indexed_size)
+            pending = b''
+            while True:
+                chunk = f.read(self.CATCH_UP_CHUNK_SIZE)
+                if not chunk:
+                    break
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop() # Incomplete last line: wait for the rest of it
+                self.add_lines([line + b'\n' for line in lines])
+        if pending and seal_torn_tail:
+            logger.warning(f"{self.log_path} ends in an incomplete line ({len(pending)} bytes). Terminating it.")
+            with open(self.log_path, 'ab') as f:
+                f.write(b'\n')
+            self.add_lines([pending + b'\n'])
+
+    def add_lines(self, lines: List[bytes], headers: Optional[List[Optional[Tuple[Any, Any]]]] = None) -> Optional[np.ndarray]:
+        """
+        Indexes lines just appended to the log at indexed_size.
+
+        Args:
+            lines: The encoded lines, each ending with a newline.
+            headers: Optional (type, created_at) per line, if already known; None entries (or no
+                     headers at all) are decoded from the line.
+
+        Returns:
+            The records added, or None if there were no lines.
+        """
+        if not lines:
+            return None
+        if headers is None:
+            headers = [None] * len(lines)
+        timestamps: List[int] = []
+        type_ids: List[int] = []
+        new_types: List[str] = []
+        for line, header in zip(lines, headers):
+            if header is None:
+                try:
+                    _, data_point_type, created_at, _ = DataStore._decode_header(line)
+                except ValueError: # Includes json.JSONDecodeError
+                    data_point_type = created_at = None
+            else:
+                data_point_type, created_at = header
+            timestamps.append(self._timestamp_us(created_at))
+            type_ids.append(self._type_id(data_point_type, new_types))
+        records = np.empty(len(lines), dtype=self.RECORD_DTYPE)
+        records['ts'] = timestamps
+        records['length'] = lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+        ends = np.cumsum(lengths) + self.indexed_size
+        records['offset'] = ends - lengths
+        records['type_id'] = type_ids
+        if new_types:
+            # Types go to disk before any record that refers to them
+            with open(self.types_path, 'ab') as f:
+                f.write(b''.join(_dumps(data_point_type) + b'\n' for data_point_type in new_types))
+        with open(self.index_path, 'ab') as f:
+            f.write(records.tobytes())
+        self._record_count += len(lines)
+        self.indexed_size = int(ends[-1])
+        return records
+
+    def _type_id(self, data_point_type: Any, new_types: List[str]) -> int:
+        if not isinstance(data_point_type, str):
+            return self.UNKNOWN_TYPE_ID
+        type_id = self._type_ids.get(data_point_type)
+        if type_id is None:
+            data_point_type = sys.intern(data_point_type)
+            type_id = self._type_ids[data_point_type] = len(self._types)
+            self._types.append(data_point_type)
+            new_types.append(data_point_type)
+        return type_id
+
+    def _timestamp_us(self, created_at: Any) -> int:
+        if not isinstance(created_at, str):
+            return self.NO_TIMESTAMP
+        try:
+            return _datetime_us(datetime.fromisoformat(created_at.replace('Z', '+00:00')))
+        except (ValueError, OverflowError):
+            return self.NO_TIMESTAMP
+
+    def __len__(self) -> int:
+        return self._record_count
+
+    def types(self) -> List[str]:
+        """Returns the distinct data point types of the indexed lines."""
+        return list(self._types)
+
+    def lookup(self, types: List[str], started_at_us: int, ended_at_us: int, positions: slice = slice(None)) -> np.ndarray:
+        """
+        Returns the records, in log order, whose type starts with one of types and whose created_at is in the window.
+        positions limits the search to a slice of the records (e.g. the latest ones).
+        """
+        wanted_types = np.fromiter((any(data_point_type.startswith(t) for t in types) for data_point_type in self._types),
+                                   dtype=bool, count=len(self._types))
+        if not wanted_types.any() or not self._record_count:
+            return np.empty(0, dtype=self.RECORD_DTYPE)
+        records = np.memmap(self.index_path, dtype=self.RECORD_DTYPE, mode='r', shape=(self._record_count,))[positions]
+        selected = _select_records(records['ts'], records['type_id'], started_at_us, ended_at_us, wanted_types)
+        return np.asarray(records[selected]) # Fancy indexing copies out, so the mapping can be released
+
+@dataclass(slots=True, frozen=True)
+class DataPoint:
+    """
+    Compact, immutable data point for hot paths that build or scan many points.
+    Uses __slots__ instead of a per-instance dict; DataStore.set() accepts it in place of a dict.
+    """
+    created_at: Optional[str]
+    type: str
+    key: Optional[str]
+    value: Any
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the data point as the dictionary form stored in the log files."""
+        data_point = {'type': self.type, 'key': self.key, 'value': self.value}
+        if self.created_at is not None:
+            data_point['created_at'] = self.created_at
+        return data_point
+
 class DataStore:
     """
     Manages storage and retrieval of all time-series data points (raw sensor and inference).
@@ -25,12 +299,35 @@ class DataStore:
     INFERENCE_DATA_FILE_NAME = "inference_data.log"
     # Note: calibrated_fingerprints.json is managed by the Fingerprinting Module
 
-    def __init__(self, log_directory: str = "data_logs"):
+    # Storage dtype for the 'value' of each data point type.
+    # WiFi RSSI readings are whole dBm values in roughly [-100, 0], so they are
+    # quantized to int8 on write (offset 0, clamped to [-128, 127]).
+    # Values of types not listed here are stored as written (numbers as JSON, i.e. float64).
+    VALUE_DTYPES: Dict[str, str] = {
+        "android.sensor.wifi_scan.rssi": "int8",
+    }
+    DEFAULT_VALUE_DTYPE = "float64"
+    INT8_MIN, INT8_MAX = -128, 127
+    # Most get_data() results kept in the window cache
+    WINDOW_CACHE_MAX = 128
+    # Index records get_latest_data() searches first, from the end of a log
+    LATEST_LOOKUP_BLOCK = 4096
+
+    def __init__(self, log_directory: str = "data_logs", batch_size: int = 500, flush_interval_ms: int = 100, buffer_size: int = 100_000, fsync: bool = False, window_cache_ttl: float = 2.0):
         """
         Initializes the DataStore, ensuring the log directory exists and setting up file paths.
+        Starts the background flusher thread that persists queued writes in batches.
 
         Args:
             log_directory: The base directory where log files will be stored.
+            batch_size: Maximum number of queued data points written per flush.
+            flush_interval_ms: How long the flusher waits for more data points before flushing.
+            buffer_size: Capacity of the shared write ring buffer. When it is full the
+                         oldest queued data point is dropped.
+            fsync: If True, fdatasync each log file after every batch written to it, so a
+                   resolved write Future means the points are durable on disk.
+            window_cache_ttl: Seconds a get_data() result is reused for an identical query
+                              (0 disables the cache). Writes into its window drop it sooner.
         """
         self.log_dir = log_directory
         self.FILE_MAP = {
@@ -43,21 +340,90 @@ class DataStore:
         self._ensure_directory()
         # Use standard threading lock for internal data structures if needed in future
         self._internal_lock = Lock()
+
+        # Writes are queued by set() and persisted by a single background flusher thread
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.fsync = fsync
+        # One ring buffer shared by every sensor type/key, so a burst from one noisy
+        # source cannot starve the others. Entries are (data_point, files, future);
+        # a None data_point is a flush barrier.
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._buffer_cond = threading.Condition()
+        # Buffered points at which producers wake the flusher before its deadline (see _enqueue)
+        self._wake_threshold = min(batch_size, buffer_size)
+        self._pending_barriers = 0
+        self._dropped_count = 0
+        self._closing = False
+        # Append-only file descriptors kept open across flushes, keyed by path (flusher thread only)
+        self._append_fds: Dict[str, int] = {}
+        # Serialization buffer reused across flushes (flusher thread only); grown, never shrunk
+        self._write_buf = bytearray(1 << 20)
+        # Full paths of log file names, filled by _get_log_file_path (log_dir is fixed per instance)
+        self._log_file_paths: Dict[str, str] = {}
+        # Sidecar indexes of the log files, keyed by path; opened on first use (see _get_index)
+        self._indexes: Dict[str, _LogIndex] = {}
+        # Read-only mmaps of the log files shared by every get_data() call, keyed by path:
+        # path -> (map, (st_dev, st_ino) of the mapped file). See _get_read_map
+        self._read_maps: Dict[str, Tuple[mmap.mmap, Tuple[int, int]]] = {}
+        # Recent get_data() results keyed by their arguments, oldest first:
+        # key -> (expires_at, window start us, window end us, log file paths, data points).
+        # The flusher drops entries whose window a written batch falls into (see _invalidate_cached_windows);
+        # the TTL only bounds staleness for lines appended to the logs by other writers.
+        self.window_cache_ttl = window_cache_ttl
+        self._window_cache: "OrderedDict[tuple, Tuple[float, int, int, Tuple[str, ...], List[Dict[str, Any]], List[int]]]" = OrderedDict()
+        self._window_cache_lock = Lock()
+        self._window_cache_generation = 0 # Bumped by every invalidation
+        # Compile (or load from cache) the index filter kernel now rather than on the first query
+        warm_up_records = np.zeros(1, dtype=_LogIndex.RECORD_DTYPE)
+        _select_records(warm_up_records['ts'], warm_up_records['type_id'], 0, 0, np.zeros(1, dtype=bool))
+        self._flusher_thread = threading.Thread(target=self._flusher_loop, name="DataStoreFlusher", daemon=True)
+        self._flusher_thread.start()
+        # Make sure queued points reach disk when the interpreter exits
+        atexit.register(self.close)
         logger.info(f"DataStore initialized. Log directory: {self.log_dir}")
 
     def _ensure_directory(self):
         """Ensures the log directory exists."""
         os.makedirs(self.log_dir, exist_ok=True)
 
+    @classmethod
+    def value_dtype(cls, data_point_type: str) -> str:
+        """Returns the storage dtype name ('int8' or the default 'float64') for a data point type."""
+        return cls.VALUE_DTYPES.get(data_point_type, cls.DEFAULT_VALUE_DTYPE)
+
+    def _quantize_value(self, data_point: dict) -> None:
+        """Coerces the data point's value in place to the storage dtype registered for its type."""
+        if self.VALUE_DTYPES.get(data_point.get('type')) != "int8":
+            return
+        value = data_point.get('value')
+        # bool is a subclass of int, leave it (and non-numeric/non-finite values) untouched
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+            data_point['value'] = max(self.INT8_MIN, min(self.INT8_MAX, int(round(value))))
+
+    def _get_index(self, filepath: str) -> _LogIndex:
+        """Returns the sidecar index of a log file, loading it from disk on first use."""
+        index = self._indexes.get(filepath)
+        if index is None:
+            with self._internal_lock:
+                index = self._indexes.get(filepath)
+                if index is None:
+                    index = self._indexes[filepath] = _LogIndex(filepath)
+        return index
+
     def _get_log_file_path(self, filename: str) -> str:
-        """Constructs the full path for a given log filename."""
+        """Constructs the full path for a given log filename (built once per name, then cached)."""
+        file_path = self._log_file_paths.get(filename)
+        if file_path is not None:
+            return file_path
         # Ensure filename is simple (e.g., remove path separators)
         safe_filename = os.path.basename(filename)
         # Ensure filename ends with .log or .jsonl (or similar)
         if not safe_filename.endswith(('.log', '.jsonl', '.json')):
             # Append .log if no recognized extension
              safe_filename += '.log' 
-        return os.path.join(self.log_dir, safe_filename)
+        file_path = self._log_file_paths[filename] = os.path.join(self.log_dir, safe_filename)
+        return file_path
 
     def get_data(
         self,
@@ -82,6 +448,17 @@ class DataStore:
         Returns:
             A list of data_point objects matching the criteria.
         """
+        # Make sure points queued by set() are on disk before reading them back
+        # (this also drops cached results the flushed points fall into)
+        self.flush()
+
+        cache_key = (tuple(types), started_at, ended_at, None if keys is None else tuple(keys), tuple(files) if files else None, limit)
+        cached_data_points = self._get_cached_window(cache_key)
+        if cached_data_points is not None:
+            logger.debug(f"Serving {len(cached_data_points)} data points for types {types}, window {started_at} to {ended_at} from the window cache")
+            return cached_data_points
+        cache_generation = self._window_cache_generation
+
         all_data_points: List[Dict[str, Any]] = []
         log_files_to_read = [self.FILE_MAP[f] for f in files] if files else list(self.FILE_MAP.values())
 
@@ -99,70 +476,26 @@ class DataStore:
                 continue
 
             try:
-                with open(file_path, 'r') as f:
-                    for line in f:
-                        try:
-                            data_point = json.loads(line)
-                            # Validate data_point structure (basic check)
-                            if not all(prop in data_point for prop in ['created_at', 'type', 'value']):
-                                logger.warning(f"Skipping invalid data_point structure in {file_path}: {line.strip()}")
-                                continue
-
-                            # Filter by type
-                            # should only compare the beginning of the type string
-                            if not any(data_point['type'].startswith(t) for t in types):
-                                # logger.debug(f"Skipping data point type '{data_point['type']}' not in {types}")
-                                continue
-
-                            # Filter by timestamp
-                            created_at_str = data_point.get('created_at')
-                            created_at_dt = None # Initialize before try block
-                            if created_at_str:
-                                try:
-                                    # Ensure the parsed datetime is timezone-aware (assume UTC if missing)
-                                    parsed_dt = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-                                    if parsed_dt.tzinfo is None:
-                                         # If naive after parsing, assume it represents UTC time
-                                         created_at_dt = parsed_dt.replace(tzinfo=timezone.utc)
-                                    else:
-                                         # If already aware, use it directly
-                                         created_at_dt = parsed_dt
-                                         
-                                except ValueError:
-                                     logger.warning(f"Invalid 'created_at' timestamp format in {file_path}: {created_at_str}. Skipping data point.")
-                                     continue # Skip to next line if timestamp is invalid
-                            else:
-                                logger.warning(f"Missing 'created_at' in data point in {file_path}: {line.strip()}. Skipping data point.")
-                                continue # Skip to next line if timestamp is missing
-
-                            # Check if created_at_dt was successfully assigned (should be aware UTC)
-                            if created_at_dt is None:
-                                logger.warning(f"Could not determine valid timestamp for line: {line.strip()}. Skipping.")
-                                continue
-                                
-                            # Perform comparison (both start_dt/end_dt and created_at_dt are aware)
-                            if not (start_dt <= created_at_dt <= end_dt):
-                                # logger.debug(f"Skipping data point created_at '{created_at_dt}' outside time window {start_dt} - {end_dt}")
-                                continue
-
-                            # Filter by key (if keys are specified)
-                            if keys is not None:
-                                data_point_key = data_point.get('key')
-                                if data_point_key not in keys:
-                                    logger.debug(f"Skipping data point key '{data_point_key}' not in {keys}")
-                                    continue
-
-                            # If all filters pass, add the data point
-                            all_data_points.append(data_point)
-
-                        except json.JSONDecodeError:
-                            logger.error(f"Error decoding JSON from log file: {file_path}, line: {line.strip()}")
-                        except Exception as e:
-                            logger.error(f"Error processing log line in {file_path}: {e}, line: {line.strip()}", exc_info=True)
+                # Only the lines the sidecar index selects for the types and window are read and decoded
+                index = self._get_index(file_path)
+                with index.lock:
+                    index.catch_up()
+                    candidates = index.lookup(types, _datetime_us(start_dt), _datetime_us(end_dt))
+                if not len(candidates):
+                    continue
+                offsets = candidates['offset'].tolist()
+                lengths = candidates['length'].tolist()
+                log_map = self._get_read_map(file_path, offsets[-1] + lengths[-1])
+                if log_map is None:
+                    continue
+                for offset, length in zip(offsets, lengths):
+                    line = log_map[offset:offset + length].decode('utf-8', errors='replace')
+                    data_point = self._match_line(line, file_path, types, start_dt, end_dt, keys)
+                    if data_point is not None:
+                        all_data_points.append(data_point)
             except Exception as e:
                  logger.error(f"Error reading log file {file_path}: {e}", exc_info=True)
 
-
         # Data points are not guaranteed to be in chronological order from reading multiple files,
         # but for window-based queries, the order within the window might be less critical.
         # If strict chronological order is needed, add sorting here:
@@ -174,40 +507,664 @@ class DataStore:
         if limit:
             all_data_points = all_data_points[:limit]
 
+        self._store_cached_window(cache_key, cache_generation, _datetime_us(start_dt), _datetime_us(end_dt), log_files_to_read, all_data_points)
         return all_data_points
 
-    def set(self, data_point: dict, files: list = ['raw_data']):
+    def _get_read_map(self, file_path: str, needed_size: int) -> Optional[mmap.mmap]:
+        """
+        Returns the shared read-only mmap of a log file, covering at least needed_size bytes if the file does.
+        The map is reused across queries and only remapped once the log grew past it, shrank below it
+        or was replaced; a replaced map is unmapped when the last reader still slicing it drops it.
+        Returns None for an empty or missing file.
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        with self._internal_lock:
+            entry = self._read_maps.get(file_path)
+            if entry is not None:
+                log_map, file_id = entry
+                # A map longer than the file would fault on the pages past its end
+                if file_id == (stat.st_dev, stat.st_ino) and needed_size <= len(log_map) <= stat.st_size:
+                    return log_map
+            try:
+                with open(file_path, 'rb') as f:
+                    stat = os.fstat(f.fileno())
+                    if stat.st_size == 0:
+                        return None
+                    log_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                self._read_maps.pop(file_path, None)
+                return None
+            self._read_maps[file_path] = (log_map, (stat.st_dev, stat.st_ino))
+            return log_map
+
+    def _get_cached_window(self, cache_key: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Returns a copy of a cached, unexpired get_data() result, or None. Callers may modify it freely."""
+        if self.window_cache_ttl <= 0:
+            return None
+        with self._window_cache_lock:
+            entry = self._window_cache.get(cache_key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._window_cache[cache_key]
+                return None
+        # Copied outside the lock: a cached list is replaced, never modified.
+        # Most points hold only scalars; those holding lists or dicts (indexed in entry[5]) are copied deeply.
+        cached_data_points = entry[4]
+        data_points = [data_point.copy() for data_point in cached_data_points]
+        for i in entry[5]:
+            data_points[i] = _copy_data_point(cached_data_points[i])
+        return data_points
+
+    def _store_cached_window(
+        self,
+        cache_key: tuple,
+        cache_generation: int,
+        start_us: int,
+        end_us: int,
+        file_paths: List[str],
+        data_points: List[Dict[str, Any]]
+    ) -> None:
+        """Caches a copy of a get_data() result (the caller keeps its own), unless a write was invalidated while it was being read."""
+        if self.window_cache_ttl <= 0:
+            return
+        data_points = [_copy_data_point(data_point) for data_point in data_points]
+        nested = [i for i, data_point in enumerate(data_points) if _is_nested(data_point)]
+        with self._window_cache_lock:
+            if cache_generation != self._window_cache_generation:
+                return # Could be missing points written during the read
+            self._window_cache[cache_key] = (time.monotonic() + self.window_cache_ttl, start_us, end_us, tuple(file_paths), data_points, nested)
+            self._window_cache.move_to_end(cache_key)
+            while len(self._window_cache) > self.WINDOW_CACHE_MAX:
+                self._window_cache.popitem(last=False)
+
+    def _invalidate_cached_windows(self, file_path: str, min_us: int, max_us: int) -> None:
+        """Drops the cached get_data() results over file_path whose window overlaps [min_us, max_us]."""
+        with self._window_cache_lock:
+            self._window_cache_generation += 1
+            stale_keys = [cache_key for cache_key, (_, start_us, end_us, file_paths, _, _) in self._window_cache.items()
+                          if start_us <= max_us and min_us <= end_us and file_path in file_paths]
+            for cache_key in stale_keys:
+                del self._window_cache[cache_key]
+
+    def get_data_ranges(
+        self,
+        types: List[str],
+        started_at: str,
+        ended_at: str,
+        files: Optional[List[str]] = None
+    ) -> List[Tuple[str, int, int]]:
+        """
+        Locates the log lines get_data() would return for these types and window (without a keys
+        filter) as byte ranges of the log files, so they can be sent as stored without being decoded.
+        Adjacent matching lines are merged into one range.
+
+        Args:
+            types: List of standardized data point types to retrieve.
+            started_at: Start of the time window (ISO 8601 string).
+            ended_at: End of the time window (ISO 8601 string).
+            files: Optional list of log file names to search within. Defaults to all relevant files.
+
+        Returns:
+            (file path, offset, length) ranges, in file order. Every range holds whole lines.
+
+        Raises:
+            ValueError: If started_at or ended_at is not a valid ISO 8601 timestamp.
+        """
+        self.flush()
+        start_us = _datetime_us(datetime.fromisoformat(started_at.replace('Z', '+00:00')))
+        end_us = _datetime_us(datetime.fromisoformat(ended_at.replace('Z', '+00:00')))
+        log_files_to_read = [self.FILE_MAP[f] for f in files] if files else list(self.FILE_MAP.values())
+
+        ranges: List[Tuple[str, int, int]] = []
+        for file_path in log_files_to_read:
+            if not os.path.exists(file_path):
+                continue
+            index = self._get_index(file_path)
+            with index.lock:
+                index.catch_up()
+                candidates = index.lookup(types, start_us, end_us)
+            if not len(candidates):
+                continue
+            offsets = candidates['offset'].astype(np.int64)
+            ends = offsets + candidates['length']
+            # A new range starts wherever a line does not directly follow the previous match
+            starts = np.flatnonzero(np.r_[True, offsets[1:] != ends[:-1]])
+            range_ends = np.r_[starts[1:], len(offsets)] - 1
+            ranges.extend((file_path, offset, length) for offset, length in
+                          zip(offsets[starts].tolist(), (ends[range_ends] - offsets[starts]).tolist()))
+        return ranges
+
+    @staticmethod
+    def read_ranges(ranges: List[Tuple[str, int, int]], chunk_size: int = 1 << 16) -> Iterable[bytes]:
+        """Yields the bytes of (file path, offset, length) ranges, as returned by get_data_ranges(), in chunks."""
+        for file_path, offset, length in ranges:
+            fd = os.open(file_path, os.O_RDONLY)
+            try:
+                end = offset + length
+                while offset < end:
+                    chunk = os.pread(fd, min(chunk_size, end - offset), offset)
+                    if not chunk:
+                        break # File shrank underneath us
+                    offset += len(chunk)
+                    yield chunk
+            finally:
+                os.close(fd)
+
+    def get_latest_data(
+        self,
+        types: List[str],
+        keys: Optional[List[str]] = None,
+        files: Optional[List[str]] = None,
+        limit: int = 50,
+        raw_values: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the most recently logged data points of the specified types/keys, newest first.
+        The sidecar index selects the lines of the types, which are then read backwards from the end
+        of each log (decoding only their header until one matches) until limit points are found.
+
+        Args:
+            types: List of standardized data point types to retrieve.
+            keys: Optional list of keys to filter by within the specified types.
+            files: Optional list of log file names to search within. Defaults to all relevant files.
+            limit: Maximum number of data points to return.
+            raw_values: Return each 'value' as its stored JSON (bytes) instead of decoding it, for
+                        callers that only pass it on (e.g. into a JSON response).
+
+        Returns:
+            Up to limit data_point objects. Within a log file they are in reverse log order; points
+            from several files are merged by created_at.
+        """
+        # Index records searched at once, walking back from the end; each further block is 4x larger
+        block_size = self.LATEST_LOOKUP_BLOCK
+        self.flush()
+        log_files_to_read = [self.FILE_MAP[f] for f in files] if files else list(self.FILE_MAP.values())
+        start_dt = datetime.min.replace(tzinfo=timezone.utc)
+        end_dt = datetime.max.replace(tzinfo=timezone.utc)
+        key_needles = self._key_needles(keys)
+
+        latest_data_points: List[Dict[str, Any]] = []
+        for file_path in log_files_to_read:
+            if not os.path.exists(file_path):
+                logger.debug(f"Log file not found: {file_path}. Skipping.")
+                continue
+            try:
+                index = self._get_index(file_path)
+                with index.lock:
+                    index.catch_up()
+                    end = len(index)
+                found = 0
+                block = block_size
+                while end > 0 and found < limit:
+                    start = max(0, end - block)
+                    with index.lock:
+                        candidates = index.lookup(types, _LogIndex.NO_TIMESTAMP + 1, np.iinfo(np.int64).max, slice(start, end))
+                    end = start
+                    block *= 4
+                    if not len(candidates):
+                        continue
+                    offsets = candidates['offset'].tolist()
+                    lengths = candidates['length'].tolist()
+                    log_map = self._get_read_map(file_path, offsets[-1] + lengths[-1])
+                    if log_map is None:
+                        break
+                    for offset, length in zip(reversed(offsets), reversed(lengths)):
+                        raw_line = log_map[offset:offset + length]
+                        if key_needles is not None and not any(needle in raw_line for needle in key_needles):
+                            continue # None of the keys occurs anywhere in the line, so it can't match
+                        line = raw_line.decode('utf-8', errors='replace')
+                        data_point = self._match_line(line, file_path, types, start_dt, end_dt, keys, raw_values)
+                        if data_point is not None:
+                            latest_data_points.append(data_point)
+                            found += 1
+                            if found >= limit:
+                                break
+            except Exception as e:
+                 logger.error(f"Error reading log file {file_path}: {e}", exc_info=True)
+
+        if len(log_files_to_read) > 1:
+            latest_data_points.sort(key=lambda data_point: data_point.get('created_at', ''), reverse=True)
+        return latest_data_points[:limit]
+
+    def _match_line(
+        self,
+        line: str,
+        file_path: str,
+        types: List[str],
+        start_dt: datetime,
+        end_dt: datetime,
+        keys: Optional[List[str]],
+        raw_value: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Decodes one log line for get_data(); returns the data point if it passes the filters, else None.
+        With raw_value, the data point's 'value' is left as its JSON bytes (see _raw_value).
+        """
+        try:
+            try:
+                data_point, data_point_type, created_at_str, data_point_key = self._decode_header(line)
+            except json.JSONDecodeError:
+                raise
+            except ValueError:
+                logger.warning(f"Skipping invalid data_point structure in {file_path}: {line.strip()}")
+                return None
+            # Intern the type so repeated types share one string and compare by identity
+            data_point_type = sys.intern(data_point_type)
+
+            # Filter by type
+            # should only compare the beginning of the type string
+            if not any(data_point_type.startswith(t) for t in types):
+                # logger.debug(f"Skipping data point type '{data_point_type}' not in {types}")
+                return None
+
+            # Filter by timestamp
+            created_at_dt = None # Initialize before try block
+            if created_at_str:
+                try:
+                    # Ensure the parsed datetime is timezone-aware (assume UTC if missing)
+                    parsed_dt = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
+                    if parsed_dt.tzinfo is None:
+                         # If naive after parsing, assume it represents UTC time
+                         created_at_dt = parsed_dt.replace(tzinfo=timezone.utc)
+                    else:
+                         # If already aware, use it directly
+                         created_at_dt = parsed_dt
+                         
+                except ValueError:
+                     logger.warning(f"Invalid 'created_at' timestamp format in {file_path}: {created_at_str}. Skipping data point.")
+                     return None # Skip to next line if timestamp is invalid
+            else:
+                logger.warning(f"Missing 'created_at' in data point in {file_path}: {line.strip()}. Skipping data point.")
+                return None # Skip to next line if timestamp is missing
+
+            # Check if created_at_dt was successfully assigned (should be aware UTC)
+            if created_at_dt is None:
+                logger.warning(f"Could not determine valid timestamp for line: {line.strip()}. Skipping.")
+                return None
+                
+            # Perform comparison (both start_dt/end_dt and created_at_dt are aware)
+            if not (start_dt <= created_at_dt <= end_dt):
+                # logger.debug(f"Skipping data point created_at '{created_at_dt}' outside time window {start_dt} - {end_dt}")
+                return None
+
+            # Filter by key (if keys are specified)
+            if keys is not None:
+                if data_point_key not in keys:
+                    logger.debug(f"Skipping data point key '{data_point_key}' not in {keys}")
+                    return None
+
+            if raw_value:
+                return {'type': data_point_type, 'key': data_point_key, 'created_at': created_at_str,
+                        'value': self._raw_value(line, data_point)}
+
+            # If all filters pass, decode the full data point (if only the header was decoded) and add it
+            if data_point is None:
+                data_point = json.loads(line)
+            data_point['type'] = data_point_type
+            return data_point
+
+        except json.JSONDecodeError:
+            logger.error(f"Error decoding JSON from log file: {file_path}, line: {line.strip()}")
+        except Exception as e:
+            logger.error(f"Error processing log line in {file_path}: {e}, line: {line.strip()}", exc_info=True)
+        return None
+
+    @staticmethod
+    def _key_needles(keys: Optional[List[str]]) -> Optional[List[bytes]]:
+        """
+        Returns the encoded keys as byte strings that a log line must contain one of to match keys,
+        or None if the lines can't be prefiltered (no key filter, or a key JSON may encode escaped).
+        """
+        if not keys:
+            return None
+        needles = [_dumps(key) for key in keys]
+        if any(not key.isascii() or needle[1:-1] != key.encode() for key, needle in zip(keys, needles)):
+            return None
+        return needles
+
+    @staticmethod
+    def _raw_value(line: str, data_point: Optional[Dict[str, Any]]) -> bytes:
+        """
+        Returns the JSON of a log line's value: sliced out of the line undecoded when only its header was
+        decoded (data_point is None, see _decode_header), else re-encoded from the decoded data point.
+        """
+        if data_point is None:
+            return bytes(_header_decoder.decode(line).value)
+        return _dumps(data_point['value'])
+
+    @staticmethod
+    def _decode_header(line: str) -> Tuple[Optional[Dict[str, Any]], str, Any, Any]:
         """
-        Writes a data point dictionary to the specified log files.
+        Decodes the fields get_data() filters on from one log line.
+
+        With msgspec available only type, created_at and key are materialized (the value is
+        skipped as raw JSON) and the returned data point is None; the caller decodes the full
+        line only for points that pass its filters. Without msgspec the full line is decoded.
+
+        Returns:
+            (data_point or None, type, created_at, key)
+
+        Raises:
+            json.JSONDecodeError: If the line is not valid JSON.
+            ValueError: If the line lacks created_at/type/value (or they have the wrong type).
+        """
+        if _header_decoder is not None:
+            try:
+                header = _header_decoder.decode(line)
+                return None, header.type, header.created_at, header.key
+            except msgspec.ValidationError as e:
+                raise ValueError(str(e)) from e
+            except msgspec.DecodeError:
+                pass # e.g. NaN literals written by the stdlib encoder; let json.loads decide
+        data_point = json.loads(line)
+        # Validate data_point structure (basic check)
+        if not all(prop in data_point for prop in ['created_at', 'type', 'value']) or not isinstance(data_point['type'], str):
+            raise ValueError("data point is missing 'created_at', 'type' or 'value'")
+        return data_point, data_point['type'], data_point.get('created_at'), data_point.get('key')
+
+    def set(self, data_point: Union[dict, DataPoint], files: list = ['raw_data']) -> Optional[Future]:
+        """
+        Queues a data point (dictionary or DataPoint) to be written to the specified log files.
+        Returns immediately; the background flusher thread persists it.
+        The data point must not be mutated after it has been queued.
 
         Args:
-            data_point: The data point dictionary to log.
+            data_point: The data point dictionary (or DataPoint) to log.
             files: A list of base filenames (without .log extension) to write to.
                    Defaults to ['raw_data'].
+
+        Returns:
+            A Future resolved once the data point has been written (or failed to be written),
+            or None if the data point was rejected.
         """
-        if not isinstance(data_point, dict):
-            logger.error(f"Invalid data_point type: {type(data_point)}. Expected dict.")
-            return
+        data_point = self._prepare_data_point(data_point)
+        if data_point is None:
+            return None
+
+        future: Future = Future()
+        self._enqueue(((data_point, tuple(files), future),))
+        return future
+
+    def set_many(self, data_points: List[Union[dict, DataPoint]], files: list = ['raw_data']) -> List[Optional[Future]]:
+        """
+        Queues several data points for the same log files with a single buffer lock acquisition.
+        Equivalent to calling set() for each data point.
+
+        Args:
+            data_points: The data point dictionaries (or DataPoints) to log.
+            files: A list of base filenames (without .log extension) to write all of them to.
+
+        Returns:
+            One entry per data point: a Future as returned by set(), or None if it was rejected.
+        """
+        files = tuple(files)
+        prepared = [self._prepare_data_point(data_point) for data_point in data_points]
+        futures: List[Optional[Future]] = [None if data_point is None else Future() for data_point in prepared]
+        self._enqueue([(data_point, files, future) for data_point, future in zip(prepared, futures) if data_point is not None])
+        return futures
+
+    def set_bytes(self, log_line: bytes, files: list = ['raw_data']) -> Optional[Future]:
+        """
+        Queues an already serialized data point (one JSON object, with or without the trailing newline)
+        to be appended as-is to the specified log files, skipping validation and re-serialization.
+
+        Args:
+            log_line: The encoded data point.
+            files: A list of base filenames (without .log extension) to write to.
+
+        Returns:
+            A Future as returned by set(), or None if the line was rejected.
+        """
+        if not isinstance(log_line, (bytes, bytearray)) or not log_line.strip():
+            logger.error(f"Invalid log_line: expected a non-empty bytes JSON line, got {type(log_line)}.")
+            return None
+        if log_line.endswith(b'\n'):
+            log_line = log_line[:-1]
+        if b'\n' in log_line:
+            logger.error("Invalid log_line: it must hold a single line.")
+            return None
+        log_line = bytes(log_line) + b'\n'
+
+        future: Future = Future()
+        self._enqueue(((log_line, tuple(files), future),))
+        return future
+
+    def _enqueue(self, entries: Iterable[Tuple[Union[dict, bytes], Tuple[str, ...], Future]]) -> None:
+        """
+        Appends (data_point, files, future) entries to the ring buffer, evicting the oldest when it is full.
+        The flusher is only woken when it has something to act on: the first point in an empty buffer,
+        or a full batch. Waking it for every point in between would only cost a context switch before
+        it goes back to waiting for its flush deadline.
+        """
+        with self._buffer_cond:
+            was_empty = not self._buffer
+            for entry in entries:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self._drop_oldest()
+                self._buffer.append(entry)
+            if was_empty or len(self._buffer) >= self._wake_threshold:
+                self._buffer_cond.notify()
+
+    def _prepare_data_point(self, data_point: Union[dict, DataPoint]) -> Optional[dict]:
+        """Validates and normalizes a data point for queueing; returns None if it is rejected."""
+        if isinstance(data_point, DataPoint):
+            data_point = data_point.to_dict()
+        elif not isinstance(data_point, dict):
+            logger.error(f"Invalid data_point type: {type(data_point)}. Expected dict or DataPoint.")
+            return None
             
         # Ensure timestamp exists
         if 'created_at' not in data_point:
             data_point['created_at'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-            
-        log_line = json.dumps(data_point) + '\n'
 
-        for file_key in files:
+        # Intern the type once on arrival; downstream type comparisons then hit the identity fast path
+        if isinstance(data_point.get('type'), str):
+            data_point['type'] = sys.intern(data_point['type'])
+
+        # Store values in their registered dtype (e.g. RSSI as int8 dBm)
+        self._quantize_value(data_point)
+        return data_point
+
+    def _drop_oldest(self) -> None:
+        """Evicts the oldest buffered data point to make room. Caller must hold _buffer_cond."""
+        data_point, _, future = self._buffer.popleft()
+        if data_point is None:
+            # Never lose a flush barrier: release its waiter, everything before it is gone anyway
+            self._pending_barriers -= 1
+            future.set_result(None)
+            return
+        self._dropped_count += 1
+        future.set_exception(BufferError("DataStore write buffer full; data point dropped"))
+        if self._dropped_count == 1 or self._dropped_count % 1000 == 0:
+            logger.warning(f"DataStore write buffer full ({self._buffer.maxlen} points). Dropped {self._dropped_count} data points so far.")
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Blocks until every data point queued before this call has been written.
+
+        Args:
+            timeout: Optional maximum number of seconds to wait.
+        """
+        if not self._flusher_thread.is_alive():
+            return
+        barrier: Future = Future()
+        with self._buffer_cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._drop_oldest()
+            self._buffer.append((None, (), barrier))
+            self._pending_barriers += 1
+            self._buffer_cond.notify()
+        barrier.result(timeout=timeout)
+
+    def close(self) -> None:
+        """Flushes all queued data points and stops the background flusher thread."""
+        if not self._flusher_thread.is_alive():
+            return
+        with self._buffer_cond:
+            self._closing = True
+            self._buffer_cond.notify()
+        self._flusher_thread.join()
+        with self._internal_lock:
+            self._read_maps.clear()
+        logger.info("DataStore flusher stopped.")
+
+    def _flusher_loop(self) -> None:
+        """Background thread: drains the shared ring buffer and persists data points in batches."""
+        while True:
+            with self._buffer_cond:
+                while not self._buffer and not self._closing:
+                    self._buffer_cond.wait()
+                if not self._buffer:
+                    for filepath in list(self._append_fds):
+                        self._close_fd(filepath)
+                    return # Closing and fully drained
+
+                # Dual trigger: flush once batch_size points are buffered OR flush_interval
+                # has passed since this batch started, whichever comes first.
+                # A pending flush barrier or close() forces an immediate flush.
+                deadline = time.monotonic() + self.flush_interval
+                while (len(self._buffer) < self.batch_size
+                       and not self._pending_barriers and not self._closing):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._buffer_cond.wait(remaining)
+
+                # Pre-size the batch and fill by index instead of growing it point by point
+                batch_len = min(len(self._buffer), self.batch_size)
+                batch = [None] * batch_len
+                popleft = self._buffer.popleft
+                for i in range(batch_len):
+                    batch[i] = popleft()
+                self._pending_barriers -= sum(1 for data_point, _, _ in batch if data_point is None)
+
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Tuple[Union[dict, bytes, None], Tuple[str, ...], Future]]) -> None:
+        """
+        Serializes a batch of queued data points and appends them with one write per log file.
+        Each data point is encoded once; the same line is shared by every file it goes to.
+        """
+        lines_by_file: Dict[str, List[bytes]] = {}
+        # (type, created_at) of each line for the sidecar indexes; None for set_bytes lines (decoded by the index)
+        headers_by_file: Dict[str, List[Optional[Tuple[Any, Any]]]] = {}
+        for data_point, files, future in batch:
+            if data_point is None:
+                continue # Flush barrier
+            if isinstance(data_point, bytes):
+                log_line = data_point # Queued by set_bytes, already encoded
+                header = None
+            else:
+                header = (data_point.get('type'), data_point.get('created_at'))
+                try:
+                    log_line = _dumps(data_point) + b'\n'
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Could not serialize data point type '{data_point.get('type')}': {e}")
+                    future.set_exception(e)
+                    continue
+            for file_key in files:
+                lines_by_file.setdefault(file_key, []).append(log_line)
+                headers_by_file.setdefault(file_key, []).append(header)
+
+        failed_files: Dict[str, Exception] = {}
+        for file_key, lines in lines_by_file.items():
             filepath = self._get_log_file_path(f"{file_key}.log")
-            
             try:
-                # Simplified write without file lock
-                with open(filepath, 'a') as f:
-                    f.write(log_line)
-                logger.debug(f"Wrote data point type '{data_point.get('type')}' to {filepath}")
-
+                index = self._get_index(filepath)
+                # Held across the append so readers never see log lines the index has not caught up with
+                with index.lock:
+                    index.catch_up(seal_torn_tail=True) # Lines appended by anything else go first
+                    with self._fill_write_buffer(lines) as data:
+                        written_at = self._append(filepath, data)
+                    try:
+                        if written_at == index.indexed_size:
+                            records = index.add_lines(lines, headers_by_file[file_key])
+                        else:
+                            # Something else appended in between: index from the log itself
+                            logger.warning(f"Batch landed at byte {written_at} of {filepath}, not at its indexed size {index.indexed_size}. Re-indexing its tail.")
+                            index.catch_up()
+                            records = None
+                    except Exception as e:
+                        logger.error(f"Error indexing {filepath}, rebuilding its index: {e}", exc_info=True)
+                        index.reset()
+                        records = None
+                # Cached get_data() results over the written timestamps are stale now
+                if records is None:
+                    self._invalidate_cached_windows(filepath, _LogIndex.NO_TIMESTAMP, np.iinfo(np.int64).max)
+                else:
+                    timestamps = records['ts'][records['ts'] != _LogIndex.NO_TIMESTAMP]
+                    if len(timestamps):
+                        self._invalidate_cached_windows(filepath, int(timestamps.min()), int(timestamps.max()))
+                logger.debug(f"Wrote {len(lines)} data points to {filepath}")
             except IOError as e:
                  logger.error(f"IOError writing to {filepath}: {e}", exc_info=True)
+                 failed_files[file_key] = e
             except Exception as e:
                  logger.error(f"Unexpected error writing to {filepath}: {e}", exc_info=True)
+                 failed_files[file_key] = e
+
+        # Resolve the futures now that every file in the batch has been written
+        for data_point, files, future in batch:
+            if future.done():
+                continue
+            error = next((failed_files[f] for f in files if f in failed_files), None)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+
+    def _fill_write_buffer(self, lines: List[bytes]) -> memoryview:
+        """Copies encoded lines into the reusable write buffer and returns a view of the filled part."""
+        needed = sum(map(len, lines))
+        if needed > len(self._write_buf):
+            self._write_buf = bytearray(max(2 * len(self._write_buf), needed))
+        buf = self._write_buf
+        pos = 0
+        for line in lines:
+            end = pos + len(line)
+            buf[pos:end] = line # Same-length slice assignment: copies in place, no resize
+            pos = end
+        return memoryview(buf)[:pos]
+
+    def _append(self, filepath: str, data: bytes) -> int:
+        """
+        Appends bytes to a log file through a cached O_APPEND descriptor (one write syscall per batch).
+        Returns the offset in the file the bytes were written at.
+        """
+        fd = self._append_fds.get(filepath)
+        if fd is not None and os.fstat(fd).st_nlink == 0:
+            # File was deleted or rotated away, reopen it at its path
+            self._close_fd(filepath)
+            fd = None
+        if fd is None:
+            fd = os.open(filepath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._append_fds[filepath] = fd
+        view = memoryview(data)
+        try:
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            if self.fsync:
+                # Only the flusher thread blocks here; set() callers never wait on the disk
+                _fdatasync(fd)
+            # O_APPEND writes at the end of the file and leaves the descriptor's position after them
+            return os.lseek(fd, 0, os.SEEK_CUR) - len(data)
+        except OSError:
+            self._close_fd(filepath) # Start from a fresh descriptor on the next batch
+            raise
+
+    def _close_fd(self, filepath: str) -> None:
+        """Closes and forgets the cached append descriptor for a log file."""
+        fd = self._append_fds.pop(filepath, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
 
     def get_unique_values(self, field_name: str, files: Optional[List[str]] = None) -> List[str]:
         """
@@ -221,10 +1178,22 @@ class DataStore:
         Returns:
             A sorted list of unique string values found for the field.
         """
+        self.flush() # Include points still queued for writing
         unique_values = set()
         log_files_to_read_keys = files if files else list(self.FILE_MAP.keys())
         log_files_to_read_paths = [self.FILE_MAP[f] for f in log_files_to_read_keys if f in self.FILE_MAP]
 
+        if field_name == 'type':
+            # The sidecar indexes already know every type in their logs
+            for file_path in log_files_to_read_paths:
+                if not os.path.exists(file_path):
+                    continue
+                index = self._get_index(file_path)
+                with index.lock:
+                    index.catch_up()
+                    unique_values.update(index.types())
+            return sorted(unique_values)
+
         logger.info(f"Scanning files {log_files_to_read_keys} for unique values of field '{field_name}'")
 
         for file_path in log_files_to_read_paths:
@@ -255,7 +1224,7 @@ class DataStore:
     def get_last_log_timestamp_for_device(self, device_ip: str, file_key: str = 'raw_data') -> Optional[str]:
         """
         Finds the latest 'created_at' timestamp for a given device IP in a specific log file.
-        Reads the file backwards for efficiency.
+        Reads the file backwards for efficiency (see get_last_log_timestamps_by_device).
 
         Args:
             device_ip: The IP address of the device to find the last log for.
@@ -264,63 +1233,64 @@ class DataStore:
         Returns:
             The ISO 8601 timestamp string of the last entry, or None if not found.
         """
+        return self.get_last_log_timestamps_by_device([device_ip], file_key=file_key)[device_ip]
+
+    def get_last_log_timestamps_by_device(self, device_ips: Iterable[str], file_key: str = 'raw_data') -> Dict[str, Optional[str]]:
+        """
+        Finds the latest 'created_at' timestamp of each of several device IPs in a specific log file,
+        in one backwards pass over its shared read map that stops once every device has been found.
+
+        Args:
+            device_ips: The IP addresses of the devices to find the last log for.
+            file_key: The key of the log file to search (e.g., 'raw_data').
+
+        Returns:
+            Each device IP mapped to the ISO 8601 timestamp string of its last entry, or None if not found.
+        """
+        self.flush() # Include points still queued for writing
+        last_logs: Dict[str, Optional[str]] = dict.fromkeys(device_ips)
         file_path = self.FILE_MAP.get(file_key)
         if not file_path or not os.path.exists(file_path):
             logger.warning(f"Log file key '{file_key}' not found or file does not exist: {file_path}")
-            return None
+            return last_logs
 
-        logger.debug(f"Searching backwards in {file_path} for last timestamp from device '{device_ip}'")
+        remaining = set(last_logs)
+        logger.debug(f"Searching backwards in {file_path} for last timestamps from devices {sorted(remaining)}")
         try:
-            with open(file_path, 'rb') as f: # Read bytes for efficient seeking
-                f.seek(0, os.SEEK_END)
-                file_size = f.tell()
-                buffer_size = 8192 # Read in 8KB chunks
-                overlap = 128 # Overlap to avoid cutting JSON objects
-                buffer = b'' 
-
-                while file_size > 0:
-                    seek_pos = max(0, file_size - buffer_size)
-                    read_size = min(buffer_size + overlap, file_size) # Read chunk + overlap
-                    f.seek(seek_pos)
-                    chunk = f.read(read_size)
-                    file_size = seek_pos
-                    
-                    buffer = chunk + buffer # Prepend previous buffer remainder
-                    
-                    # Process lines in the current buffer (except maybe the first partial line)
-                    lines = buffer.splitlines(True) # Keep ends
-                    
-                    if file_size > 0: # If not at the beginning, first line might be incomplete
-                         buffer = lines.pop(0) # Keep potential partial line for next iteration
-                    else:
-                         buffer = b'' # Reached beginning, process everything
-                         
-                    # Iterate lines in reverse order within the buffer
-                    for line_bytes in reversed(lines):
-                        try:
-                            line_str = line_bytes.decode('utf-8').strip()
-                            if not line_str: continue
-                            
-                            data_point = json.loads(line_str)
-                            if data_point.get('device') == device_ip:
-                                timestamp = data_point.get('created_at')
-                                if timestamp:
-                                     logger.debug(f"Found last timestamp for {device_ip}: {timestamp}")
-                                     return timestamp # Found the latest entry
-                        except json.JSONDecodeError:
-                            continue # Skip invalid JSON
-                        except UnicodeDecodeError:
-                             logger.warning(f"Skipping line with decode error in {file_path}")
-                             continue
-                        except Exception as e:
-                             logger.warning(f"Error processing line for last timestamp: {e}")
-                             continue # Skip problematic lines
-                             
+            log_map = self._get_read_map(file_path, os.path.getsize(file_path))
+            end = len(log_map) if log_map is not None else 0
+            while remaining and end > 0:
+                # Line ending at end (its newline included), found by searching back for the previous newline
+                start = log_map.rfind(b'\n', 0, end - 1) + 1
+                line_bytes = log_map[start:end]
+                end = start
+                try:
+                    line_str = line_bytes.decode('utf-8').strip()
+                    if not line_str: continue
+
+                    data_point = json.loads(line_str)
+                    device_ip = data_point.get('device')
+                    if device_ip in remaining:
+                        timestamp = data_point.get('created_at')
+                        if timestamp:
+                            logger.debug(f"Found last timestamp for {device_ip}: {timestamp}")
+                            last_logs[device_ip] = timestamp # Found the latest entry
+                            remaining.discard(device_ip)
+                except json.JSONDecodeError:
+                    continue # Skip invalid JSON
+                except UnicodeDecodeError:
+                     logger.warning(f"Skipping line with decode error in {file_path}")
+                     continue
+                except Exception as e:
+                     logger.warning(f"Error processing line for last timestamp: {e}")
+                     continue # Skip problematic lines
+
         except Exception as e:
             logger.error(f"Error reading file {file_path} backwards: {e}", exc_info=True)
 
-        logger.warning(f"No log entry found for device '{device_ip}' in {file_path}")
-        return None # Not found
+        for device_ip in remaining:
+            logger.warning(f"No log entry found for device '{device_ip}' in {file_path}")
+        return last_logs
 
 # Example Usage (for testing purposes)
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+"""
+Compiled filter kernels of the DataStore's sidecar log index.
+
+Kept out of data_store.py for the same reason as inference_kernels.py: Numba's on-disk cache
+(cache=True) is invalidated whenever the kernel's source file changes.
+"""
+import numpy as np
+
+# Numba is optional: it compiles the index record filter; the NumPy filter is used without it
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def select_records_numpy(
+    timestamps: np.ndarray,
+    type_ids: np.ndarray,
+    started_at_us: int,
+    ended_at_us: int,
+    wanted_types: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the positions of the index records with started_at_us <= timestamp <= ended_at_us
+    whose type id is flagged in wanted_types (a bool per known type id; ids past its end never match).
+    """
+    # One extra, never wanted, slot that every out-of-range id is clamped to
+    lookup = np.zeros(len(wanted_types) + 1, dtype=bool)
+    lookup[:-1] = wanted_types
+    mask = (timestamps >= started_at_us) & (timestamps <= ended_at_us)
+    mask &= lookup[np.minimum(type_ids, len(wanted_types))]
+    return np.flatnonzero(mask)
+
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def select_records(timestamps, type_ids, started_at_us, ended_at_us, wanted_types):
+        """Numba-compiled select_records_numpy: one pass over the records, no temporary masks."""
+        positions = np.empty(len(timestamps), dtype=np.int64)
+        n_types = len(wanted_types)
+        count = 0
+        for i in range(len(timestamps)):
+            type_id = type_ids[i]
+            if (started_at_us <= timestamps[i] <= ended_at_us
+                    and type_id < n_types and wanted_types[type_id]):
+                positions[count] = i
+                count += 1
+        return positions[:count]
+else:
+    select_records = select_records_numpy
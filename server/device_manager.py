@@ -15,6 +15,21 @@ logger = logging.getLogger(__name__)
 
 from collector import Collector
 
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Device frames are decoded straight from the received str/bytes into plain
+# dicts; msgspec skips json's intermediate decode work on every sensor frame.
+if msgspec is not None:
+    _frame_decoder = msgspec.json.Decoder()
+    _decode_frame = _frame_decoder.decode
+    _FRAME_DECODE_ERRORS = (json.JSONDecodeError, msgspec.DecodeError)
+else:
+    _decode_frame = json.loads
+    _FRAME_DECODE_ERRORS = (json.JSONDecodeError,)
+
 
 class DeviceManager:
     """
@@ -172,17 +187,18 @@ class DeviceManager:
                         async for message in websocket:
                             try:
                                 # Ensure correct variables are used for the collector call
-                                raw_data = json.loads(message)
+                                raw_data = _decode_frame(message)
                                 self.collector.receive_raw_data(raw_data, device_identifier=friendly_name, device_ip=device_ip) # Use vars from function start
                                 logger.debug(f"Received and passed raw data from device WebSocket client ({device_ip}, ID: {friendly_name}): {raw_data.get('type', 'Unknown Type')}")
 
-                                # Push sensor data with IP - Directly await the push coroutine
-                                await self._push_data_to_frontend({
-                                    'type': 'sensor_data',
-                                    'device': device_ip, # Use IP
-                                    'data': raw_data
-                                })
-                            except json.JSONDecodeError:
+                                # Push sensor data with IP - the frame is already valid JSON, so
+                                # splice it into the envelope instead of re-encoding raw_data
+                                if isinstance(message, bytes):
+                                    message = message.decode('utf-8')
+                                await self._send_to_frontend(
+                                    f'{{"type": "sensor_data", "device": {json.dumps(device_ip)}, "data": {message}}}'
+                                )
+                            except _FRAME_DECODE_ERRORS:
                                 logger.warning(f"Received invalid JSON over device WebSocket client: {message}")
                             except Exception as e:
                                 logger.error(f"Error processing device WebSocket client message: {e}", exc_info=True)
@@ -265,7 +281,7 @@ class DeviceManager:
             async for message in websocket:
                 # Assume message is a JSON string containing raw sensor data
                 try:
-                    raw_data = json.loads(message)
+                    raw_data = _decode_frame(message)
                     # Pass the raw data to the Collector
                     self.collector.receive_raw_data(raw_data)
                     logger.debug(f"Received and passed raw data from device WebSocket server: {raw_data.get('type', 'Unknown Type')}")
@@ -277,7 +293,7 @@ class DeviceManager:
                     # For now, this is a placeholder for that logic.
                     # await self._push_data_to_frontend(raw_data) # Example call
 
-                except json.JSONDecodeError:
+                except _FRAME_DECODE_ERRORS:
                     logger.warning(f"Received invalid JSON over device WebSocket server: {message}")
                 except Exception as e:
                     logger.error(f"Error processing device WebSocket server message: {e}", exc_info=True)
@@ -311,7 +327,11 @@ class DeviceManager:
             
         if message is None:
              return
-             
+
+        await self._send_to_frontend(message)
+
+    async def _send_to_frontend(self, message: str):
+        """Sends an already-encoded JSON message to all connected frontend websockets."""
         # Re-implement sequential send loop with wait_for
         sockets_to_send = list(self._frontend_websockets) 
         sent_count = 0
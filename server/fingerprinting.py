@@ -1,6 +1,8 @@
 import json
 import os
 import logging
+import sys
+from array import array # Typed, contiguous columns for the per-sample path ids and values
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 import statistics # For calculating median and standard deviation
@@ -11,6 +13,54 @@ import numpy as np # For median and standard deviation calculations
 logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Numba is optional: it JIT-compiles the per-path statistics kernel; NumPy is used without it
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _segment_stats_numpy(sorted_values: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Median and population stddev of each segment of sorted_values beginning at starts (NumPy fallback)."""
+    ends = np.append(starts[1:], len(sorted_values))
+    medians = np.empty(len(starts))
+    std_devs = np.empty(len(starts))
+    for g, (s, e) in enumerate(zip(starts.tolist(), ends.tolist())):
+        segment = sorted_values[s:e]
+        medians[g] = np.median(segment)
+        std_devs[g] = np.std(segment)
+    return medians, std_devs
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _segment_stats(sorted_values, starts):
+        """Median and population stddev of each segment of sorted_values beginning at starts.
+        Values must be sorted within each segment, so the median is read off the middle."""
+        n_groups = len(starts)
+        medians = np.empty(n_groups)
+        std_devs = np.empty(n_groups)
+        for g in range(n_groups):
+            s = starts[g]
+            e = starts[g + 1] if g + 1 < n_groups else len(sorted_values)
+            count = e - s
+            mid = s + count // 2
+            if count % 2 == 1:
+                medians[g] = sorted_values[mid]
+            else:
+                medians[g] = (sorted_values[mid - 1] + sorted_values[mid]) / 2.0
+            mean = 0.0
+            for i in range(s, e):
+                mean += sorted_values[i]
+            mean /= count
+            sq = 0.0
+            for i in range(s, e):
+                sq += (sorted_values[i] - mean) ** 2
+            std_devs[g] = np.sqrt(sq / count)
+        return medians, std_devs
+else:
+    _segment_stats = _segment_stats_numpy
+
 # Assume DataStore class is available (either imported or in the same project)
 # For this example, we'll assume it's imported from data_store.py
 try:
@@ -27,6 +77,9 @@ except ImportError:
         def set_data(self, data_point, files=['raw_data']):
             logger.warning("Using dummy DataStore.set_data - no data will be written.")
             pass
+        @classmethod
+        def value_dtype(cls, data_point_type):
+            return "float64"
 
 # Assume InferenceModule class is available
 # Import is needed for type hinting and potentially dummy class definition
@@ -80,8 +133,14 @@ class FingerprintingModule:
         os.makedirs(self.storage_dir, exist_ok=True)
         logger.info(f"FingerprintingModule initialized. Storage directory: {self.storage_dir}")
 
+        # mtime (ns) of the calibrated fingerprints file as of the last load/save; set by _load_from_storage
+        self._calibrated_mtime_ns: Optional[int] = None
         # Load calibrated fingerprints on initialization
         self._calibrated_fingerprints: Dict[str, Dict[str, Any]] = self._load_from_storage()
+        # Bumped whenever a calibrated fingerprint is saved/updated, so consumers can reuse derived data
+        self._version = 0
+        # Prefix-filtered views of the calibrated fingerprints: prefix -> (version, filtered dict)
+        self._prefix_views: Dict[str, Tuple[int, Dict[str, Dict[str, Any]]]] = {}
 
     def set_inference_module(self, inference_module: InferenceModule) -> None:
         """
@@ -91,11 +150,22 @@ class FingerprintingModule:
         self._inference_module = inference_module
         logger.info("InferenceModule instance set in FingerprintingModule.")
 
-    def _load_from_storage(self) -> Dict[str, Dict[str, Any]]:
-        """Loads calibrated fingerprints from the JSON file."""
-        if not os.path.exists(self.calibrated_fingerprints_path):
+    def _get_storage_mtime(self) -> Optional[int]:
+        """Returns the calibrated fingerprints file's mtime in nanoseconds, or None if it does not exist."""
+        try:
+            return os.stat(self.calibrated_fingerprints_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_from_storage(self, fallback: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Loads calibrated fingerprints from the JSON file.
+        Returns fallback (default: an empty collection) if the file is missing or cannot be read.
+        """
+        self._calibrated_mtime_ns = self._get_storage_mtime()
+        if self._calibrated_mtime_ns is None:
             logger.info("Calibrated fingerprints file not found. Starting with empty collection.")
-            return {}
+            return {} if fallback is None else fallback
 
         try:
             with open(self.calibrated_fingerprints_path, 'r') as f:
@@ -107,10 +177,10 @@ class FingerprintingModule:
                 return calibrated_data
         except json.JSONDecodeError as e:
             logger.error(f"Error decoding JSON from {self.calibrated_fingerprints_path}: {e}")
-            return {} # Return empty on error
+            return {} if fallback is None else fallback # Return empty on error
         except Exception as e:
             logger.error(f"Unexpected error loading calibrated fingerprints: {e}", exc_info=True)
-            return {} # Return empty on error
+            return {} if fallback is None else fallback # Return empty on error
 
     def _save_to_storage(self) -> None:
         """Saves the current calibrated fingerprints to the JSON file."""
@@ -123,12 +193,20 @@ class FingerprintingModule:
 
             with open(self.calibrated_fingerprints_path, 'w') as f:
                 json.dump(serializable_data, f, indent=2)
+            self._calibrated_mtime_ns = self._get_storage_mtime() # Our own write is not an external change
             logger.info(f"Successfully saved {len(self._calibrated_fingerprints)} calibrated fingerprints to {self.calibrated_fingerprints_path}")
         except Exception as e:
             logger.error(f"Error saving calibrated fingerprints to {self.calibrated_fingerprints_path}: {e}", exc_info=True)
 
 
-    def generate_fingerprint(self, fingerprint_type: str, inference_config_name: str, ended_at: str) -> Optional[Dict[str, Any]]:
+    def generate_fingerprint(
+        self,
+        fingerprint_type: str,
+        inference_config_name: str,
+        ended_at: str,
+        include_soa: bool = False,
+        data_points: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Generates a fingerprint from data points in the Data Store, based on an inference config.
         Pre-populates statistics based on the config's included_paths.
@@ -137,6 +215,11 @@ class FingerprintingModule:
             fingerprint_type: The type to assign to the generated fingerprint (e.g., 'location.current').
             inference_config_name: The name of the inference configuration to use.
             ended_at: End of the data window (ISO 8601 string).
+            include_soa: Also attach 'statistics_soa', the statistics as parallel NumPy arrays
+                         ('paths', 'index' path -> row, 'median', 'std', 'num_samples').
+                         Not JSON serializable: callers must pop it before storing or sending the fingerprint.
+            data_points: The data points of the window, if the caller already fetched them
+                         (used as-is instead of querying the DataStore).
 
         Returns:
             A fingerprint object dictionary or None if config not found or error occurs.
@@ -175,7 +258,10 @@ class FingerprintingModule:
             
         # 3. Fetch Data Points (only if types are specified)
         all_data_points = []
-        if data_point_types_to_fetch:
+        if data_points is not None:
+            all_data_points = data_points
+            logger.info(f"Using {len(all_data_points)} prefetched data points for fingerprint generation.")
+        elif data_point_types_to_fetch:
             try:
                 all_data_points = self.data_store.get_data(
                     types=data_point_types_to_fetch,
@@ -188,31 +274,62 @@ class FingerprintingModule:
                  # Continue with empty data, stats will remain default
 
         # 4. Group Data Points by Path and Calculate Statistics
-        grouped_data: Dict[str, List[float]] = {}
+        # The samples are collected column-wise (int32 path id, float64 value) into typed arrays that
+        # NumPy wraps without copying; the per-path statistics are then computed for all paths at once
+        # by a compiled kernel instead of per-path Python calls.
+        path_ids: Dict[str, int] = {}
+        path_ids_by_type: Dict[str, Dict[Any, int]] = {} # type -> key -> path id, avoids building the path string per sample
+        group_ids = array('i')
+        values = array('d')
+        append_group_id = group_ids.append
+        append_value = values.append
         for dp in all_data_points:
-            # Construct the data path (type or type.key)
-            path = dp['type']
-            if dp.get('key') is not None:
-                path = f"{path}.{dp['key']}"
-            
             # Check if the BASE TYPE of the data point is in included_paths
             # The DataStore query already filters by data_point_types_to_fetch
             # base_type = dp['type']
             # if base_type in included_paths: # <-- REMOVED CHECK
             value = dp.get('value')
             # Ensure value is numeric for calculations
-            if isinstance(value, (int, float)):
-                if path not in grouped_data:
-                    grouped_data[path] = []
-                grouped_data[path].append(float(value))
+            if not isinstance(value, (int, float)):
+                continue
+            dp_type = dp['type']
+            dp_key = dp.get('key')
+            key_ids = path_ids_by_type.get(dp_type)
+            if key_ids is None:
+                key_ids = path_ids_by_type[dp_type] = {}
+            path_id = key_ids.get(dp_key)
+            if path_id is None:
+                # Construct the data path (type or type.key)
+                path = dp_type if dp_key is None else f"{dp_type}.{dp_key}"
+                path_id = path_ids.get(path)
+                if path_id is None:
+                    # Interned once per path; calibrated profiles intern theirs too, so lookups hit the identity fast path
+                    path = sys.intern(path)
+                    path_id = path_ids[path] = len(path_ids)
+                key_ids[dp_key] = path_id
+            append_group_id(path_id)
+            append_value(value)
 
         # 5. Update Statistics Dictionary with Calculated Values
-        for path, values in grouped_data.items():
-            if values: # Ensure there are values to calculate
-                num_samples = len(values)
-                median_value = np.median(values)
-                std_dev_value = np.std(values)
-                
+        # Rows of the statistics arrays are path ids: lexsort keeps the segments in path id order
+        medians = std_devs = np.empty(0)
+        counts = np.empty(0, dtype=np.int64)
+        if values:
+            group_arr = np.frombuffer(group_ids, dtype=np.int32)
+            values_arr = np.frombuffer(values, dtype=np.float64)
+
+            # Sort by (path id, value) so each path is one contiguous, sorted segment
+            order = np.lexsort((values_arr, group_arr))
+            sorted_groups = group_arr[order]
+            sorted_values = values_arr[order]
+            starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+            counts = np.diff(np.append(starts, len(sorted_values)))
+            medians, std_devs = _segment_stats(sorted_values, starts)
+
+            paths_by_id = list(path_ids)
+            for path_id, num_samples, median_value, std_dev_value in zip(
+                    sorted_groups[starts].tolist(), counts.tolist(), medians.tolist(), std_devs.tolist()):
+                path = paths_by_id[path_id]
                 # ADD the path to statistics dynamically
                 statistics[path] = {
                     'median_value': median_value,
@@ -220,9 +337,6 @@ class FingerprintingModule:
                     'num_samples': num_samples
                 }
                 logger.debug(f"Calculated stats for path '{path}': n={num_samples}, median={median_value:.2f}, stddev={std_dev_value:.2f}")
-            else:
-                 # This case shouldn't happen if values were added correctly, but handle defensively
-                 logger.warning(f"Path '{path}' found in grouped_data but has no values.")
 
         # Compress raw data for reference (optional)
         # raw_data_ref = self._compress_data(all_data_points)
@@ -247,6 +361,15 @@ class FingerprintingModule:
             }
         }
         
+        if include_soa:
+            fingerprint['statistics_soa'] = {
+                'paths': list(path_ids),
+                'index': path_ids,
+                'median': medians,
+                'std': std_devs,
+                'num_samples': counts
+            }
+
         logger.info(f"Successfully generated fingerprint for type '{fingerprint_type}'")
         return fingerprint
 
@@ -282,15 +405,43 @@ class FingerprintingModule:
         }
 
 
-    def load_calibrated_fingerprints(self) -> Dict[str, Dict[str, Any]]:
+    def load_calibrated_fingerprints(self, prefix: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
         """
-        Load all calibrated fingerprints from storage.
+        Load calibrated fingerprints from storage.
+        The file is re-read only when its mtime has changed since it was last loaded or saved.
+
+        Args:
+            prefix: Optional fingerprint type prefix (e.g. 'location.'). If given, only fingerprints
+                    whose type starts with it are returned.
 
         Returns:
             A dictionary of calibrated fingerprints, keyed by fingerprint type.
         """
+        if self._get_storage_mtime() != self._calibrated_mtime_ns:
+            logger.info(f"Calibrated fingerprints file {self.calibrated_fingerprints_path} changed on disk. Reloading.")
+            # Keep the current fingerprints if the changed file cannot be parsed
+            self._calibrated_fingerprints = self._load_from_storage(fallback=self._calibrated_fingerprints)
+            self._version += 1
+
         # Return the already loaded fingerprints
-        return self._calibrated_fingerprints
+        if prefix is None:
+            return self._calibrated_fingerprints
+
+        # The filtered view is rebuilt only when the calibrated fingerprints change; callers may
+        # rely on getting the same dict object back for an unchanged version
+        cached_view = self._prefix_views.get(prefix)
+        if cached_view is not None and cached_view[0] == self._version:
+            return cached_view[1]
+        filtered = {
+            fp_type: fp_data for fp_type, fp_data in self._calibrated_fingerprints.items()
+            if fp_type.startswith(prefix)
+        }
+        self._prefix_views[prefix] = (self._version, filtered)
+        return filtered
+
+    def get_version(self) -> int:
+        """Returns a counter that changes whenever the calibrated fingerprints change."""
+        return self._version
 
     def save_calibrated_fingerprint(self, fingerprint: Dict[str, Any]) -> None:
         """
@@ -306,6 +457,7 @@ class FingerprintingModule:
             return
 
         self._calibrated_fingerprints[fp_type] = fingerprint
+        self._version += 1
         self._save_to_storage()
         logger.info(f"Saved calibrated fingerprint: {fp_type}")
 
@@ -332,6 +484,7 @@ class FingerprintingModule:
         fingerprint['updated_at'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
 
         self._calibrated_fingerprints[fingerprint_type] = fingerprint
+        self._version += 1
         self._save_to_storage()
         logger.info(f"Updated calibrated fingerprint: {fingerprint_type}")
 
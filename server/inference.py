@@ -1,6 +1,10 @@
+import bisect
+import hashlib
 import json
 import os
 import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
@@ -9,9 +13,49 @@ import numpy as np
 logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Path scoring kernels (Numba-compiled when available), in their own module to keep Numba's cache valid
+from inference_kernels import score_paths as _score_paths
+
+# Prefer orjson for configuration file I/O; fall back to stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ciso8601 is optional: a C ISO-8601 parser; Python 3.11+ fromisoformat accepts the 'Z' suffix natively
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
+if ciso8601 is not None:
+    _parse_iso = ciso8601.parse_datetime
+elif sys.version_info >= (3, 11):
+    _parse_iso = datetime.fromisoformat
+else:
+    def _parse_iso(s: str) -> datetime:
+        return datetime.fromisoformat(s.replace('Z', '+00:00'))
+
+def _iso_z(dt: datetime) -> str:
+    """Formats a datetime as ISO-8601, using the 'Z' suffix for UTC."""
+    return dt.isoformat().replace('+00:00', 'Z')
+
+def _now_iso_z() -> str:
+    """Returns the current UTC time as an ISO-8601 string with the 'Z' suffix."""
+    return _iso_z(datetime.now(timezone.utc))
+
+# Properties every inference configuration must define to be saved or updated
+_REQUIRED_PROPS = frozenset((
+    'inference_type', 'data_point_types', 'included_paths', 'sensor_weights',
+    'window_duration_seconds', 'confidence_threshold', 'significant_difference'
+))
+
+# Interned sensor type constants, so comparisons against interned data point types are pointer compares
+_TYPE_WIFI_RSSI = sys.intern('android.sensor.wifi_scan.rssi')
+
 # Assume DataStore class is available (either imported or in the same project)
 try:
-    from data_store import DataStore
+    from data_store import DataStore, DataPoint
 except ImportError:
     logger.error("DataStore module not found. Please ensure data_store.py is available.")
     # Define a dummy DataStore class if import fails
@@ -24,6 +68,11 @@ except ImportError:
         def set_data(self, data_point, files=['raw_data']):
             logger.warning("Using dummy DataStore.set_data - no data will be written.")
             pass
+        def set_many(self, data_points, files=['raw_data']):
+            logger.warning("Using dummy DataStore.set_many - no data will be written.")
+            return [None] * len(data_points)
+    from collections import namedtuple
+    DataPoint = namedtuple('DataPoint', ['created_at', 'type', 'key', 'value'])
 
 # Assume FingerprintingModule class is available
 # Import is needed for type hinting and potentially dummy class definition
@@ -35,10 +84,10 @@ except ImportError:
     class FingerprintingModule:
         def __init__(self, data_store=None, storage_dir="fingerprints"):
             pass
-        def load_calibrated_fingerprints(self):
+        def load_calibrated_fingerprints(self, prefix=None):
             logger.warning("Using dummy FingerprintingModule.load_calibrated_fingerprints - no fingerprints will be loaded.")
             return {}
-        def generate_fingerprint(self, fingerprint_type, inference_config_name, ended_at):
+        def generate_fingerprint(self, fingerprint_type, inference_config_name, ended_at, include_soa=False, data_points=None):
              logger.warning("Using dummy FingerprintingModule.generate_fingerprint - no fingerprint will be generated.")
              return None
 
@@ -51,6 +100,8 @@ class InferenceModule:
 
     # Define the file name for inference configurations
     INFERENCE_CONFIGS_FILE = "inference_configurations.json"
+    # Below this many calibrated targets, scoring them serially beats the thread pool's overhead
+    PARALLEL_SCORING_MIN_TARGETS = 4
 
     def __init__(self, data_store: DataStore, config_dir: str = "configs"): # Removed fingerprinting_module from __init__
         """
@@ -71,7 +122,20 @@ class InferenceModule:
         logger.info(f"InferenceModule initialized. Configuration directory: {self.config_dir}")
 
         # Load inference configurations on initialization
+        # The file's mtime and the hash of its last loaded/saved content drive reloads and skipped saves
+        self._config_mtime_ns: Optional[int] = None
+        self._last_saved_hash: Optional[bytes] = None
         self._inference_configurations: Dict[str, Dict[str, Any]] = self._load_configurations()
+        self._version = 0 # Bumped whenever the configurations change (see get_version)
+        # Compile (or load from cache) the scoring kernel now rather than on the first inference run
+        _score_paths(*np.ones((5, 1)), 0.0)
+
+        # Run parameters parsed from each configuration, keyed by name: (source config, parsed params).
+        # Entries are dropped when a configuration is saved or reloaded and re-parsed if the config object was replaced.
+        self._config_cache: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+        # Scores calibrated targets concurrently; worker threads are only started on first use
+        self._score_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='inference-score')
 
     def set_fingerprinting_module(self, fingerprinting_module: FingerprintingModule) -> None:
         """
@@ -79,32 +143,57 @@ class InferenceModule:
         This resolves the circular dependency.
         """
         self._fingerprinting_module = fingerprinting_module
+        self._config_cache.clear() # Drop calibration data memoized from the previous module
         logger.info("FingerprintingModule instance set in InferenceModule.")
 
 
-    def _load_configurations(self) -> Dict[str, Dict[str, Any]]:
-        """Loads inference configurations from the JSON file."""
-        if not os.path.exists(self.inference_configs_path):
+    def _get_configurations_mtime(self) -> Optional[int]:
+        """Returns the configurations file's mtime in nanoseconds, or None if it does not exist."""
+        try:
+            return os.stat(self.inference_configs_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_configurations(self, fallback: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Loads inference configurations from the JSON file.
+        Returns fallback (default: an empty collection) if the file is missing or cannot be read.
+        """
+        self._config_mtime_ns = self._get_configurations_mtime()
+        if self._config_mtime_ns is None:
             logger.info("Inference configurations file not found. Starting with empty collection.")
-            return {}
+            return {} if fallback is None else fallback
 
         try:
-            with open(self.inference_configs_path, 'r') as f:
-                configurations = json.load(f)
+            with open(self.inference_configs_path, 'rb') as f:
+                raw = f.read()
+                # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the handler below covers both
+                configurations = orjson.loads(raw) if orjson is not None else json.loads(raw)
+                self._last_saved_hash = hashlib.blake2b(raw).digest()
                 logger.info(f"Successfully loaded {len(configurations)} inference configurations from {self.inference_configs_path}")
                 return configurations
         except json.JSONDecodeError as e:
             logger.error(f"Error decoding JSON from {self.inference_configs_path}: {e}")
-            return {} # Return empty on error
+            return {} if fallback is None else fallback # Return empty on error
         except Exception as e:
             logger.error(f"Unexpected error loading inference configurations: {e}", exc_info=True)
-            return {} # Return empty on error
+            return {} if fallback is None else fallback # Return empty on error
 
     def _save_configurations(self) -> None:
-        """Saves the current inference configurations to the JSON file."""
+        """Saves the current inference configurations to the JSON file (skipped if the content is unchanged)."""
         try:
-            with open(self.inference_configs_path, 'w') as f:
-                json.dump(self._inference_configurations, f, indent=2)
+            if orjson is not None:
+                payload = orjson.dumps(self._inference_configurations, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                payload = json.dumps(self._inference_configurations, indent=2).encode('utf-8')
+            payload_hash = hashlib.blake2b(payload).digest()
+            if payload_hash == self._last_saved_hash and self._get_configurations_mtime() == self._config_mtime_ns:
+                logger.debug(f"Inference configurations unchanged; skipping write to {self.inference_configs_path}")
+                return
+            with open(self.inference_configs_path, 'wb') as f:
+                f.write(payload)
+            self._last_saved_hash = payload_hash
+            self._config_mtime_ns = self._get_configurations_mtime() # Our own write is not an external change
             logger.info(f"Successfully saved {len(self._inference_configurations)} inference configurations to {self.inference_configs_path}")
         except Exception as e:
             logger.error(f"Error saving inference configurations to {self.inference_configs_path}: {e}", exc_info=True)
@@ -112,13 +201,23 @@ class InferenceModule:
     def load_inference_configurations(self) -> Dict[str, Dict[str, Any]]:
         """
         Load all inference configurations from storage.
+        The file is re-read only when its mtime has changed since it was last loaded or saved.
 
         Returns:
             A dictionary of inference configurations, keyed by name.
         """
-        # Return the already loaded configurations
+        if self._get_configurations_mtime() != self._config_mtime_ns:
+            logger.info(f"Inference configurations file {self.inference_configs_path} changed on disk. Reloading.")
+            # Keep the current configurations if the changed file cannot be parsed
+            self._inference_configurations = self._load_configurations(fallback=self._inference_configurations)
+            self._config_cache.clear()
+            self._version += 1
         return self._inference_configurations
 
+    def get_version(self) -> int:
+        """Returns a counter that changes whenever the inference configurations change."""
+        return self._version
+
     def save_inference_configuration(self, inference_config: Dict[str, Any]) -> None:
         """
         Save a new inference configuration.
@@ -133,20 +232,21 @@ class InferenceModule:
             return
 
         # Ensure required properties are present (basic check)
-        required_props = ['inference_type', 'data_point_types', 'included_paths', 'sensor_weights', 'window_duration_seconds', 'confidence_threshold', 'significant_difference']
-        missing_props = [prop for prop in required_props if prop not in inference_config]
+        missing_props = _REQUIRED_PROPS.difference(inference_config)
         if missing_props:
-             error_msg = f"Inference configuration '{config_name}' is missing required properties: {', '.join(missing_props)}. Cannot save."
+             error_msg = f"Inference configuration '{config_name}' is missing required properties: {', '.join(sorted(missing_props))}. Cannot save."
              logger.error(error_msg)
              raise ValueError(error_msg) # Raise exception
 
         # Add/update timestamps
-        now_str = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        now_str = _now_iso_z()
         if 'created_at' not in inference_config:
             inference_config['created_at'] = now_str
         inference_config['updated_at'] = now_str
 
         self._inference_configurations[config_name] = inference_config
+        self._config_cache.pop(config_name, None)
+        self._version += 1
         self._save_configurations()
         logger.info(f"Saved inference configuration: {config_name}")
 
@@ -170,25 +270,164 @@ class InferenceModule:
              raise ValueError(error_msg) # Raise exception
 
         # Ensure required properties are present (basic check)
-        required_props = ['inference_type', 'data_point_types', 'included_paths', 'sensor_weights', 'window_duration_seconds', 'confidence_threshold', 'significant_difference']
-        missing_props = [prop for prop in required_props if prop not in inference_config]
+        missing_props = _REQUIRED_PROPS.difference(inference_config)
         if missing_props:
-             error_msg = f"Inference configuration '{config_name}' is missing required properties: {', '.join(missing_props)}. Cannot update."
+             error_msg = f"Inference configuration '{config_name}' is missing required properties: {', '.join(sorted(missing_props))}. Cannot update."
              logger.error(error_msg)
              raise ValueError(error_msg) # Raise exception
 
         # Update the updated_at timestamp
-        inference_config['updated_at'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        inference_config['updated_at'] = _now_iso_z()
 
         self._inference_configurations[config_name] = inference_config
+        self._config_cache.pop(config_name, None)
+        self._version += 1
         self._save_configurations()
         logger.info(f"Updated inference configuration: {config_name}")
 
 
+    def _parse_configuration(self, inference_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Extracts the run parameters of an inference configuration, applying defaults."""
+        return {
+            'inference_type': inference_config.get('inference_type'),
+            'included_paths': inference_config.get('included_paths', []),
+            'data_point_types': inference_config.get('data_point_types', []),
+            'window_duration_seconds': inference_config.get('window_duration_seconds'),
+            'sensor_weights': inference_config.get('sensor_weights', {}),
+            'weight_lut': self._build_weight_lut(inference_config.get('sensor_weights', {})),
+            # Minimum stddev per path type: (path substring, min stddev), first match wins
+            'min_stddev_rules': (
+                ('wifi_scan.rssi', inference_config.get('min_std_dev_rssi') or 0.01),
+                ('pressure', inference_config.get('min_std_dev_pressure') or 0.01),
+                # Add entries for other types if needed
+            ),
+            'path_matches': {}, # Memo of _match_path results for this configuration
+            'confidence_threshold': inference_config.get('confidence_threshold', 0.0),
+            'significant_difference': inference_config.get('significant_difference', 1.0),
+        }
+
+    @staticmethod
+    def _build_weight_lut(sensor_weights: Dict[str, float]) -> Tuple[List[str], List[float], List[int]]:
+        """
+        Returns sensor_weights as sorted prefixes, their weights and, per prefix, the index of its
+        longest proper prefix among them (-1 if none), for bisect-based longest-prefix matching.
+        """
+        prefixes = sorted(sensor_weights)
+        parents: List[int] = []
+        for i, prefix in enumerate(prefixes):
+            # Any prefix of `prefix` sorts before it, and is an ancestor of its sorted predecessor
+            parent = i - 1
+            while parent >= 0 and not prefix.startswith(prefixes[parent]):
+                parent = parents[parent]
+            parents.append(parent)
+        return prefixes, [sensor_weights[prefix] for prefix in prefixes], parents
+
+    @staticmethod
+    def _match_path(
+        full_path: str,
+        weight_lut: Tuple[List[str], List[float], List[int]],
+        min_stddev_rules: Tuple[Tuple[str, float], ...],
+        path_matches: Dict[str, Tuple[float, Optional[str], float]]
+    ) -> Tuple[float, Optional[str], float]:
+        """
+        Returns (weight, matched prefix, min stddev) for a path. The weight comes from the longest matching
+        sensor_weights prefix, or is 0.0 (prefix None) if no prefix matches; the min stddev from the first
+        matching min_stddev_rules entry, or 0.01. Results are memoized in path_matches, since the same
+        paths recur across calibrated fingerprints and runs.
+        """
+        match = path_matches.get(full_path)
+        if match is None:
+            prefixes, weights, parents = weight_lut
+            # Every matching prefix is the greatest prefix <= full_path or one of its ancestors,
+            # and ancestors get shorter, so the first one that matches is the longest
+            i = bisect.bisect_right(prefixes, full_path) - 1
+            while i >= 0 and not full_path.startswith(prefixes[i]):
+                i = parents[i]
+            min_stddev = next((value for part, value in min_stddev_rules if part in full_path), 0.01)
+            match = (weights[i], prefixes[i], min_stddev) if i >= 0 else (0.0, None, min_stddev)
+            if len(path_matches) >= 100_000:
+                path_matches.clear() # Bound the memo if paths keep changing
+            path_matches[full_path] = match
+        return match
+
+    def _get_parsed_configuration(self, inference_config_name: str, inference_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the parsed run parameters of a configuration, parsed once per configuration object."""
+        cached = self._config_cache.get(inference_config_name)
+        if cached is not None and cached[0] is inference_config:
+            return cached[1]
+        parsed_config = self._parse_configuration(inference_config)
+        self._config_cache[inference_config_name] = (inference_config, parsed_config)
+        return parsed_config
+
+    def run_inference_batch(self, inference_config_names: List[str], current_time: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Runs several inference configurations for the same current_time with a single DataStore read.
+        The union of their data_point_types is fetched once over the longest of their windows; each
+        configuration then gets the points matching its own types and window through vectorized masks.
+
+        Args:
+            inference_config_names: The names of the inference configurations to run.
+            current_time: The current timestamp (ISO 8601 string) to use as the end of every data window.
+
+        Returns:
+            The structured inference result of each configuration (as returned by run_inference), keyed by name.
+        """
+        try:
+            current_time_dt = _parse_iso(current_time)
+        except ValueError as e:
+            logger.error(f"Invalid 'current_time' timestamp format: {e}")
+            return {name: {} for name in inference_config_names}
+        if current_time_dt.tzinfo is None:
+            current_time_dt = current_time_dt.replace(tzinfo=timezone.utc) # As the DataStore reads it
+
+        # Types and window start of every runnable configuration; the others are reported by run_inference
+        configurations = self.load_inference_configurations()
+        windows: Dict[str, Tuple[Tuple[str, ...], datetime]] = {}
+        for name in inference_config_names:
+            inference_config = configurations.get(name)
+            if not inference_config:
+                continue
+            parsed_config = self._get_parsed_configuration(name, inference_config)
+            if not parsed_config['data_point_types'] or parsed_config['window_duration_seconds'] is None:
+                continue
+            windows[name] = (tuple(parsed_config['data_point_types']),
+                             current_time_dt - timedelta(seconds=parsed_config['window_duration_seconds']))
+
+        window_points: Dict[str, List[Dict[str, Any]]] = {}
+        if windows:
+            union_types = sorted({t for types, _ in windows.values() for t in types})
+            earliest_dt = min(started_at_dt for _, started_at_dt in windows.values())
+            shared_points = self.data_store.get_data(types=union_types, started_at=_iso_z(earliest_dt), ended_at=current_time)
+            logger.info(f"Fetched {len(shared_points)} data points once for {len(windows)} inference configurations")
+
+            # Columns of the shared points: epoch microseconds and an id per distinct type
+            point_times = []
+            for dp in shared_points:
+                created_at_dt = _parse_iso(dp['created_at'])
+                if created_at_dt.tzinfo is None:
+                    created_at_dt = created_at_dt.replace(tzinfo=timezone.utc)
+                point_times.append(created_at_dt.timestamp())
+            point_times_arr = np.asarray(point_times, dtype=np.float64)
+            type_ids: Dict[str, int] = {}
+            point_type_ids = np.fromiter((type_ids.setdefault(dp['type'], len(type_ids)) for dp in shared_points),
+                                         dtype=np.int64, count=len(shared_points))
+
+            for name, (types, started_at_dt) in windows.items():
+                matching_type_ids = [type_id for data_point_type, type_id in type_ids.items() if data_point_type.startswith(types)]
+                mask = np.isin(point_type_ids, matching_type_ids)
+                mask &= point_times_arr >= started_at_dt.timestamp()
+                window_points[name] = [shared_points[i] for i in np.flatnonzero(mask).tolist()]
+
+        return {
+            name: self.run_inference(name, current_time, data_points=window_points.get(name))
+            for name in inference_config_names
+        }
+
     def run_inference(
         self,
         inference_config_name: str,
-        current_time: str
+        current_time: str,
+        data_points: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         Execute an inference run for a specific configuration.
@@ -196,6 +435,8 @@ class InferenceModule:
         Args:
             inference_config_name: The name of the inference configuration to run.
             current_time: The current timestamp (ISO 8601 string) to use as the end of the data window.
+            data_points: The data points of the configuration's window, if already fetched
+                         (see run_inference_batch); queried from the DataStore otherwise.
 
         Returns:
             The structured inference result.
@@ -205,43 +446,49 @@ class InferenceModule:
             logger.error("FingerprintingModule is not set. Cannot run inference.")
             return {}
 
-        # 1. Load the specified inference configuration
-        inference_config = self._inference_configurations.get(inference_config_name)
+        # 1. Load the specified inference configuration (picks up on-disk changes)
+        inference_config = self.load_inference_configurations().get(inference_config_name)
         if not inference_config:
             logger.error(f"Inference configuration '{inference_config_name}' not found. Cannot run inference.")
             return {} # Return empty dict if config not found
 
-        inference_type = inference_config.get('inference_type')
-        included_paths = inference_config.get('included_paths', [])
+        # Parsed once per configuration object and reused by every later run
+        parsed_config = self._get_parsed_configuration(inference_config_name, inference_config)
+
+        inference_type = parsed_config['inference_type']
+        included_paths = parsed_config['included_paths']
         # Use data_point_types from config for querying, as per contract
-        data_point_types_to_query = inference_config.get('data_point_types', [])
-        window_duration_seconds = inference_config.get('window_duration_seconds')
-        sensor_weights = inference_config.get('sensor_weights', {})
-        confidence_threshold = inference_config.get('confidence_threshold', 0.0)
-        significant_difference = inference_config.get('significant_difference', 1.0)
+        data_point_types_to_query = parsed_config['data_point_types']
+        window_duration_seconds = parsed_config['window_duration_seconds']
+        sensor_weights = parsed_config['sensor_weights']
+        confidence_threshold = parsed_config['confidence_threshold']
+        significant_difference = parsed_config['significant_difference']
 
         if not included_paths or window_duration_seconds is None or not data_point_types_to_query:
              logger.error(f"Inference configuration '{inference_config_name}' is missing required parameters ('included_paths', 'window_duration_seconds', or 'data_point_types').")
              return {}
 
         try:
-            current_time_dt = datetime.fromisoformat(current_time.replace('Z', '+00:00'))
+            current_time_dt = _parse_iso(current_time)
             started_at_dt = current_time_dt - timedelta(seconds=window_duration_seconds)
-            started_at_str = started_at_dt.isoformat().replace('+00:00', 'Z')
+            started_at_str = _iso_z(started_at_dt)
         except ValueError as e:
             logger.error(f"Invalid 'current_time' timestamp format: {e}")
             return {}
 
         logger.info(f"Running inference '{inference_config_name}' ({inference_type}) using data points ${data_point_types_to_query} from {started_at_str} to {current_time}")
 
-        # 2. Get the current data window from the DataStore
-        # Use the data_point_types_to_query from the config
-        current_data_window_points = self.data_store.get_data(
-            types=data_point_types_to_query, # Use the full data point types
-            started_at=started_at_str,
-            ended_at=current_time,
-            files=['raw_data'] # Assume current data is in 'raw_data.log'
-        )
+        # 2. Get the current data window from the DataStore (unless run_inference_batch already did)
+        # Use the data_point_types_to_query from the config. Read once here and handed to
+        # generate_fingerprint, so it covers the same log files the fingerprint is built from.
+        if data_points is not None:
+            current_data_window_points = data_points
+        else:
+            current_data_window_points = self.data_store.get_data(
+                types=data_point_types_to_query, # Use the full data point types
+                started_at=started_at_str,
+                ended_at=current_time
+            )
 
         if not current_data_window_points:
             logger.warning(f"No current data points found for inference '{inference_config_name}' in the window {started_at_str} to {current_time}.")
@@ -253,8 +500,12 @@ class InferenceModule:
         current_fingerprint = self._fingerprinting_module.generate_fingerprint(
             fingerprint_type=inference_type,
             inference_config_name=inference_config_name,
-            ended_at=current_time
+            ended_at=current_time,
+            include_soa=True,
+            data_points=current_data_window_points
         )
+        # The array form is only used for scoring; the fingerprint itself stays JSON serializable
+        current_soa = current_fingerprint.pop('statistics_soa', None) if current_fingerprint else None
         
         if not current_fingerprint or not current_fingerprint.get('statistics'):
              logger.warning(f"Could not generate current fingerprint or it has no statistics for config '{inference_config_name}' and window ending {current_time}. Cannot perform comparison.")
@@ -264,16 +515,30 @@ class InferenceModule:
         logger.info(f"Generated current fingerprint with {len(current_fingerprint.get('statistics', {}))} statistical paths.")
         # --- END NEW --- 
 
-        # 3. Load all calibrated fingerprints
-        calibrated_fingerprints = self._fingerprinting_module.load_calibrated_fingerprints() # Use the set instance
-
-        # Filter calibrated fingerprints to those relevant for this inference type
+        # 3. Load the calibrated fingerprints relevant for this inference type
         # A calibrated fingerprint is relevant if its type matches the inference type namespace
         # e.g., inference_type 'location' matches fingerprint types 'location.kitchen', 'location.office'
-        relevant_calibrated_fingerprints = {
-            fp_type: fp_data for fp_type, fp_data in calibrated_fingerprints.items()
-            if fp_type.startswith(f"{inference_type}.") # Assuming fingerprint types are namespaced like 'inference_type.name'
-        }
+        relevant_calibrated_fingerprints = self._fingerprinting_module.load_calibrated_fingerprints(
+            prefix=f"{inference_type}." # Assuming fingerprint types are namespaced like 'inference_type.name'
+        )
+
+        # The precomputed arrays of the relevant fingerprints are memoized on the parsed configuration
+        # until the FingerprintingModule reports a new calibration version
+        get_version = getattr(self._fingerprinting_module, 'get_version', None)
+        calibration_version = get_version() if get_version is not None else None
+        cached_calibration = parsed_config.get('calibration')
+        if (cached_calibration is not None and calibration_version is not None
+                and cached_calibration[0] == calibration_version and cached_calibration[1] is relevant_calibrated_fingerprints):
+            calibrated_profiles, target_ids, shared_paths = cached_calibration[2], cached_calibration[3], cached_calibration[4]
+        else:
+            calibrated_profiles = {
+                fp_type: self._build_calibrated_profile(fp_data, inference_config, parsed_config)
+                for fp_type, fp_data in relevant_calibrated_fingerprints.items()
+            }
+            # Extract name from type (e.g., 'kitchen' from 'location.kitchen'), interned for reuse across runs
+            target_ids = {fp_type: sys.intern(fp_type.split('.', 1)[-1]) for fp_type in relevant_calibrated_fingerprints}
+            shared_paths = self._share_profile_paths(calibrated_profiles)
+            parsed_config['calibration'] = (calibration_version, relevant_calibrated_fingerprints, calibrated_profiles, target_ids, shared_paths)
 
         if not relevant_calibrated_fingerprints:
             logger.warning(f"No relevant calibrated fingerprints found for inference type '{inference_type}'. Cannot perform comparison.")
@@ -285,18 +550,32 @@ class InferenceModule:
 
         # 4. Iterate through relevant calibrated fingerprints and calculate scores
         inference_comparisons: List[Dict[str, Any]] = []
-        best_prediction_target_id: Optional[str] = None
-        best_prediction_confidence = -1.0 # Confidence is 0-1, so -1 is a good initial low value
-
-        for fp_type, calibrated_fp_data in relevant_calibrated_fingerprints.items():
-            target_id = fp_type.split('.', 1)[-1] # Extract name from type (e.g., 'kitchen' from 'location.kitchen')
 
-            # Calculate score and confidence for this comparison
-            score_details = self._calculate_score(
+        # The targets share most of their paths: look each one up in the current statistics once per run,
+        # and let every target pick its rows out of the result (see _align_soa_medians)
+        if current_soa is not None:
+            current_index = current_soa['index']
+            current_soa['shared_rows'] = np.fromiter((current_index.get(full_path, -1) for full_path in shared_paths),
+                                                     dtype=np.int64, count=len(shared_paths))
+
+        # Targets are independent: score them on the thread pool when there are enough of them.
+        # map() keeps the target order, so ties in the best prediction resolve as in a serial run.
+        def score_target(fp_type: str) -> Dict[str, Any]:
+            return self._calculate_score(
                 current_fingerprint, # Pass the generated stats
-                calibrated_fp_data,
-                inference_config
+                relevant_calibrated_fingerprints[fp_type],
+                inference_config,
+                parsed_config,
+                calibrated_profiles[fp_type],
+                current_soa
             )
+        if len(relevant_calibrated_fingerprints) >= self.PARALLEL_SCORING_MIN_TARGETS:
+            all_score_details = self._score_pool.map(score_target, relevant_calibrated_fingerprints)
+        else:
+            all_score_details = map(score_target, relevant_calibrated_fingerprints)
+
+        for fp_type, score_details in zip(relevant_calibrated_fingerprints, all_score_details):
+            target_id = target_ids[fp_type]
 
             comparison_result = {
                 'target_type': fp_type,
@@ -307,11 +586,14 @@ class InferenceModule:
             }
             inference_comparisons.append(comparison_result)
 
-            # Update best prediction if this comparison has higher confidence
-            if score_details['confidence_score'] > best_prediction_confidence:
-                best_prediction_confidence = score_details['confidence_score']
-                best_prediction_target_id = target_id
-
+        # Best prediction: the first comparison with the highest confidence, picked in one argmax pass
+        best_prediction_target_id: Optional[str] = None
+        best_prediction_confidence = -1.0 # Confidence is 0-1, so -1 is a good initial low value
+        if inference_comparisons:
+            confidences = np.fromiter((c['confidence_score'] for c in inference_comparisons), dtype=np.float64, count=len(inference_comparisons))
+            best_idx = int(np.argmax(confidences))
+            best_prediction_confidence = inference_comparisons[best_idx]['confidence_score']
+            best_prediction_target_id = inference_comparisons[best_idx]['target_id']
 
         # 5. Determine overall prediction and confidence
         overall_predicted_value = None
@@ -328,7 +610,7 @@ class InferenceModule:
         inference_result: Dict[str, Any] = {
             'inference_name': inference_config_name,
             'inference_type': inference_type, # Include inference_type in the result
-            'created_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            'created_at': _now_iso_z(),
             'overall_prediction': {
                 'value': overall_predicted_value,
                 'confidence': best_prediction_confidence
@@ -340,132 +622,201 @@ class InferenceModule:
         # 7. Convert inference result to data_point format for logging
         output_data_points = self._convert_result_to_data_points(inference_result)
 
-        # 8. Log inference result data_points to the DataStore
-        for dp in output_data_points:
-             # Log prediction and confidence to raw_data and inference_data
-             if dp['type'] in [f'inference.{inference_type}.prediction', f'inference.{inference_type}.confidence']:
-                  self.data_store.set(dp, files=['raw_data', 'inference_data'])
-             else:
-                  self.data_store.set(dp, files=['inference_data']) # Log other inference metrics only to inference_data log
+        # 8. Log inference result data_points to the DataStore, one set_many call per target file set
+        # Log prediction and confidence to raw_data and inference_data
+        raw_and_inference_types = (f'inference.{inference_type}.prediction', f'inference.{inference_type}.confidence')
+        raw_and_inference_points = [dp for dp in output_data_points if dp['type'] in raw_and_inference_types]
+        inference_only_points = [dp for dp in output_data_points if dp['type'] not in raw_and_inference_types]
+        if raw_and_inference_points:
+             self.data_store.set_many(raw_and_inference_points, files=['raw_data', 'inference_data'])
+        if inference_only_points:
+             self.data_store.set_many(inference_only_points, files=['inference_data']) # Log other inference metrics only to inference_data log
 
 
         logger.info(f"Inference run '{inference_config_name}' completed.") # Removed data point count
         return inference_result # RETURN THE FULL RESULT OBJECT
 
 
+    def _build_calibrated_profile(
+        self,
+        calibrated_fingerprint: Dict[str, Any],
+        inference_config: Dict[str, Any],
+        parsed_config: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Precomputes the calibrated side of _calculate_score for one calibrated fingerprint:
+        the weighted paths and their aligned weight, median, stddev and min stddev arrays.
+        Depends only on the calibrated fingerprint and the configuration, so it is reused across runs.
+        """
+        if parsed_config is None:
+            parsed_config = self._parse_configuration(inference_config)
+        weight_lut = parsed_config['weight_lut']
+        min_stddev_rules = parsed_config['min_stddev_rules']
+        path_matches = parsed_config['path_matches']
+
+        paths: List[str] = []
+        calib_stats: List[Optional[Dict[str, Any]]] = []
+        weights: List[float] = []
+        calib_medians: List[float] = []
+        calib_stddevs: List[float] = []
+        min_stddevs: List[float] = []
+        comparable: List[bool] = [] # Calibrated stats present with a numeric median
+
+        # Iterate through the paths PRESENT IN THE CALIBRATED FINGERPRINT stats
+        for full_path, calib_stat in calibrated_fingerprint.get('statistics', {}).items():
+            # --- Weight Lookup: longest matching sensor_weights prefix (base type) ---
+            weight, matched_base_type, path_min_stddev = self._match_path(full_path, weight_lut, min_stddev_rules, path_matches)
+
+            if weight == 0.0:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Skipping path '%s' as no matching base type with non-zero weight found in sensor_weights (checked prefixes: %s).", full_path, weight_lut[0])
+                continue
+            logger.debug("Path '%s' matched base type '%s' for weight: %s", full_path, matched_base_type, weight)
+            # --- End Weight Lookup ---
+
+            calib_median = np.nan
+            calib_stddev = 0.01
+            min_stddev = 0.01 # Default minimum
+            if calib_stat:
+                # Use calibrated stddev, default to min value if missing/zero
+                calib_stddev = calib_stat.get('std_dev_value', 0.01)
+                if not isinstance(calib_stddev, (int, float)):
+                    calib_stddev = 0.01
+
+                # Min stddev based on path type, resolved along with the weight
+                min_stddev = path_min_stddev
+
+                if isinstance(calib_stat.get('median_value'), (int, float)):
+                    calib_median = calib_stat['median_value']
+
+            # Interned, like the current fingerprint's paths, so aligning them is an identity compare
+            paths.append(sys.intern(full_path))
+            calib_stats.append(calib_stat)
+            weights.append(weight)
+            calib_medians.append(calib_median)
+            calib_stddevs.append(calib_stddev)
+            min_stddevs.append(min_stddev)
+            comparable.append(bool(calib_stat) and isinstance(calib_stat.get('median_value'), (int, float)))
+
+        return {
+            'paths': paths,
+            'calib_stats': calib_stats,
+            # Kernel inputs
+            'weights': np.asarray(weights, dtype=np.float64),
+            'calib_medians': np.asarray(calib_medians, dtype=np.float64),
+            'calib_stddevs': np.asarray(calib_stddevs, dtype=np.float64),
+            'min_stddevs': np.asarray(min_stddevs, dtype=np.float64),
+            'comparable': np.asarray(comparable, dtype=bool),
+            'incomparable_rows': [i for i, is_comparable in enumerate(comparable) if not is_comparable],
+            'nonnegative_weights': all(weight >= 0 for weight in weights),
+            # Python values for building path_contributions and debug output
+            'weight_values': weights,
+            'calib_median_values': calib_medians,
+            'calib_stddev_values': calib_stddevs,
+        }
+
+    @staticmethod
+    def _share_profile_paths(calibrated_profiles: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Returns the distinct paths of all the calibrated profiles, and stores in each profile
+        ('shared_rows') the position of each of its paths in that list.
+        """
+        shared_ids: Dict[str, int] = {}
+        for calibrated_profile in calibrated_profiles.values():
+            paths = calibrated_profile['paths']
+            calibrated_profile['shared_rows'] = np.fromiter(
+                (shared_ids.setdefault(full_path, len(shared_ids)) for full_path in paths), dtype=np.int64, count=len(paths))
+        return list(shared_ids)
+
     def _calculate_score(
         self,
         current_fingerprint: Dict[str, Any],
         calibrated_fingerprint: Dict[str, Any],
-        inference_config: Dict[str, Any]
+        inference_config: Dict[str, Any],
+        parsed_config: Optional[Dict[str, Any]] = None,
+        calibrated_profile: Optional[Dict[str, Any]] = None,
+        current_soa: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Compares statistics from the current window against a calibrated fingerprint.
         Iterates through paths in the calibrated fingerprint's statistics.
-        Applies weights based on the base type defined in the inference config.
+        Applies weights based on the longest matching base type defined in the inference config.
 
         Args:
             current_statistics: The current data statistics dictionary (keyed by full path).
             calibrated_fingerprint: The calibrated fingerprint object to compare against.
             inference_config: The inference configuration being used.
+            parsed_config: The parsed run parameters of inference_config (parsed here if omitted).
+            calibrated_profile: The precomputed arrays of calibrated_fingerprint from
+                                _build_calibrated_profile (built here if omitted).
+            current_soa: The struct-of-arrays statistics of current_fingerprint, as returned by
+                         generate_fingerprint(include_soa=True). Used instead of the per-path dicts.
 
         Returns:
             A dictionary containing: total_score, confidence_score, path_contributions.
         """
-        total_score = 0.0
-        path_contributions: Dict[str, Dict[str, Any]] = {}
-        
-        sensor_weights = inference_config.get('sensor_weights', {})
-
-        current_fingerprint_stats = current_fingerprint.get('statistics', {})
-        calibrated_fingerprint_stats = calibrated_fingerprint.get('statistics', {})
-
-        # Iterate through the paths PRESENT IN THE CALIBRATED FINGERPRINT stats
-        for full_path, calib_stat in calibrated_fingerprint_stats.items():
-            # --- CORRECTED Weight Lookup ---
-            weight = 0.0
-            matched_base_type = None
-            # Check against keys in sensor_weights (which should be base types)
-            for base_type_key in sensor_weights.keys():
-                if full_path.startswith(base_type_key):
-                    weight = sensor_weights[base_type_key]
-                    matched_base_type = base_type_key
-                    # Optional: For robustness, ensure we take the longest match if prefixes overlap
-                    # This basic version takes the first match found.
-                    break # Found a matching base type
+        if calibrated_profile is None:
+            calibrated_profile = self._build_calibrated_profile(calibrated_fingerprint, inference_config, parsed_config)
+        paths = calibrated_profile['paths']
+        calib_stats = calibrated_profile['calib_stats']
+
+        # Phase 1: align the current medians on the calibrated paths.
+        # Paths that cannot be compared keep a NaN median and contribute 0.
+        if current_soa is not None:
+            current_medians = self._align_soa_medians(current_soa, calibrated_profile)
+        else:
+            current_medians = self._align_dict_medians(current_fingerprint.get('statistics', {}), paths, calib_stats)
 
-            if weight == 0.0:
-                logger.debug(f"Skipping path '{full_path}' as no matching base type with non-zero weight found in sensor_weights (checked prefixes: {list(sensor_weights.keys())}).")
-                continue
-            logger.debug(f"Path '{full_path}' matched base type '{matched_base_type}' for weight: {weight}")
-            # --- End CORRECTED Weight Lookup ---
+        confidence_scaling_factor = inference_config.get('confidence_scaling_factor', 0.01)
+        # Use default value if the retrieved value is None (e.g., from explicit null in config)
+        actual_scaling_factor = confidence_scaling_factor if confidence_scaling_factor is not None else 0.01
 
-            # Get the corresponding statistics for the current window
-            current_stat = current_fingerprint_stats.get(full_path) # Get stats dict for this path
+        # Phase 2: score the paths in one pass of the vector kernel. The confidence only falls as the
+        # score grows (with non-negative weights), so the kernel stops once the confidence is pinned at 0
+        # and only the paths scored up to then get a contribution.
+        total_score, unweighted_metrics, weighted_contributions = _score_paths(
+            np.asarray(current_medians, dtype=np.float64),
+            calibrated_profile['calib_medians'],
+            calibrated_profile['calib_stddevs'],
+            calibrated_profile['weights'],
+            calibrated_profile['min_stddevs'],
+            float(actual_scaling_factor) if calibrated_profile['nonnegative_weights'] else 0.0
+        )
 
-            unweighted_metric = 0.0
-            weighted_contribution = 0.0
+        weighted_contribution_values = weighted_contributions.tolist()
+        unweighted_metric_values = unweighted_metrics.tolist()
 
-            # If we have statistics for this path in BOTH calibrated and current fingerprints
-            if calib_stat and current_stat:
-                current_median = current_stat.get('median_value')
-                calib_median = calib_stat.get('median_value')
-                # Use calibrated stddev, default to min value if missing/zero
-                calib_stddev = calib_stat.get('std_dev_value', 0.01) 
-                
-                # --- Determine appropriate min stddev based on path type --- 
-                min_stddev = 0.01 # Default minimum
-                if 'wifi_scan.rssi' in full_path:
-                     min_stddev = inference_config.get('min_std_dev_rssi') or 0.01
-                elif 'pressure' in full_path:
-                     min_stddev = inference_config.get('min_std_dev_pressure') or 0.01
-                # Add elif for other types if needed
-                # --- 
-                
-                safe_stddev = max(calib_stddev, min_stddev) # Use the configured or default minimum
+        # Per-path debug dump; skipped entirely unless DEBUG is enabled
+        if logger.isEnabledFor(logging.DEBUG):
+            for full_path, weighted_contribution, unweighted_metric, current_median, calib_median, calib_stddev in zip(
+                    paths, weighted_contribution_values, unweighted_metric_values, current_medians,
+                    calibrated_profile['calib_median_values'], calibrated_profile['calib_stddev_values']):
+                if current_median == current_median: # Not NaN: the path was compared
+                    logger.debug("  Path '%s': CurrentMedian=%.2f, CalibMedian=%.2f, CalibStdDev=%.2f, Metric=%.2f, Weighted=%.2f",
+                                 full_path, current_median, calib_median, calib_stddev, unweighted_metric, weighted_contribution)
 
-                # Check if both medians are valid numbers for comparison
-                if isinstance(calib_median, (int, float)) and isinstance(current_median, (int, float)):
-                    # Compare medians
-                    unweighted_metric = abs(current_median - calib_median) / safe_stddev
-                    weighted_contribution = unweighted_metric * weight
-                    logger.debug(f"  Path '{full_path}': CurrentMedian={current_median:.2f}, CalibMedian={calib_median:.2f}, CalibStdDev={calib_stddev:.2f}, Metric={unweighted_metric:.2f}, Weighted={weighted_contribution:.2f}")
-                else:
-                    # Handle cases where one or both medians might be None (e.g., path exists but no numeric data)
-                     logger.warning(f"  Path '{full_path}': Missing median value in current ({current_median}) or calibrated ({calib_median}) stats. Skipping comparison.")
-            else:
-                # Handle missing data (path exists in calibrated but not current, or vice-versa)
-                # Apply a penalty? For now, log and contribute 0.
-                if not current_stat:
-                    logger.debug(f"  Path '{full_path}': No current data/stats found for this path (present in calibrated).")
-                    # TODO: Apply penalty for missing current data
-                if not calib_stat: # Should not happen based on loop, but check defensively
-                     logger.warning(f"Path '{full_path}' present in loop but missing in calibrated_stats dict? Should not happen.")
-            
-            # Store contribution keyed by the full_path from the fingerprint
-            # logger.debug(f"Assigning path_contribution for: {full_path}") # Can remove this now
+        # Store contribution keyed by the full_path from the fingerprint
+        path_contributions: Dict[str, Dict[str, Any]] = {}
+        for full_path, weighted_contribution, unweighted_metric, weight in zip(
+                paths, weighted_contribution_values, unweighted_metric_values, calibrated_profile['weight_values']):
             path_contributions[full_path] = {
                 'weighted_contribution': weighted_contribution,
                 'unweighted_metric': unweighted_metric,
                 'weight': weight
             }
-            total_score += weighted_contribution
 
         # TODO: Consider paths in current_statistics but NOT in calibrated_stats?
         # Should we apply a penalty if the current fingerprint sees networks/keys
         # that the calibrated one doesn't have? For now, we only score based on calibrated paths.
 
         # --- Dummy confidence score calculation (needs proper implementation) ---
-        confidence_scaling_factor = inference_config.get('confidence_scaling_factor', 0.01)
-        # Use default value if the retrieved value is None (e.g., from explicit null in config)
-        actual_scaling_factor = confidence_scaling_factor if confidence_scaling_factor is not None else 0.01
         confidence_score = max(0.0, min(1.0, 1.0 - (total_score * actual_scaling_factor)))
         # --- END Dummy confidence ---
 
-        logger.debug(f"Calculated score for {calibrated_fingerprint.get('type')}: Total={total_score:.2f}, Confidence={confidence_score:.2f}")
+        logger.debug("Calculated score for %s: Total=%.2f, Confidence=%.2f", calibrated_fingerprint.get('type'), total_score, confidence_score)
         
         # Log the final state of path_contributions before returning
-        logger.debug(f"Final path_contributions before return: {path_contributions}")
+        logger.debug("Final path_contributions before return: %s", path_contributions)
 
         return {
             'total_score': total_score,
@@ -474,6 +825,75 @@ class InferenceModule:
         }
 
 
+    @staticmethod
+    def _align_soa_medians(current_soa: Dict[str, Any], calibrated_profile: Dict[str, Any]) -> List[float]:
+        """Aligns the struct-of-arrays current medians on the calibrated paths by integer row lookup."""
+        paths = calibrated_profile['paths']
+        shared_rows = current_soa.get('shared_rows')
+        if shared_rows is not None and 'shared_rows' in calibrated_profile:
+            rows = shared_rows[calibrated_profile['shared_rows']] # Looked up once for all the targets of the run
+        else:
+            current_index = current_soa['index']
+            rows = np.fromiter((current_index.get(full_path, -1) for full_path in paths), dtype=np.int64, count=len(paths))
+        present = rows >= 0
+        compared = present & calibrated_profile['comparable']
+        current_medians = np.full(len(paths), np.nan)
+        current_medians[compared] = current_soa['median'][rows[compared]]
+
+        # Calibrated stats that cannot be compared (current medians are always numeric here)
+        for i in calibrated_profile['incomparable_rows']:
+            calib_stat = calibrated_profile['calib_stats'][i]
+            if not calib_stat: # Should not happen based on loop, but check defensively
+                logger.warning(f"Path '{paths[i]}' present in loop but missing in calibrated_stats dict? Should not happen.")
+            elif present[i]:
+                logger.warning(f"  Path '{paths[i]}': Missing median value in current ({current_soa['median'][rows[i]]}) or calibrated ({calib_stat.get('median_value')}) stats. Skipping comparison.")
+        if logger.isEnabledFor(logging.DEBUG):
+            for i in np.flatnonzero(~present).tolist():
+                logger.debug("  Path '%s': No current data/stats found for this path (present in calibrated).", paths[i])
+        return current_medians.tolist()
+
+    @staticmethod
+    def _align_dict_medians(
+        current_fingerprint_stats: Dict[str, Dict[str, Any]],
+        paths: List[str],
+        calib_stats: List[Optional[Dict[str, Any]]]
+    ) -> List[float]:
+        """Aligns the current medians on the calibrated paths from the per-path statistics dicts."""
+        current_medians: List[float] = [np.nan] * len(paths)
+        for i, (full_path, calib_stat) in enumerate(zip(paths, calib_stats)):
+            # Get the corresponding statistics for the current window
+            current_stat = current_fingerprint_stats.get(full_path) # Get stats dict for this path
+
+            # If we have statistics for this path in BOTH calibrated and current fingerprints
+            if calib_stat and current_stat:
+                current_median = current_stat.get('median_value')
+                # Check if both medians are valid numbers for comparison
+                if isinstance(current_median, (int, float)) and isinstance(calib_stat.get('median_value'), (int, float)):
+                    current_medians[i] = current_median
+                else:
+                    # Handle cases where one or both medians might be None (e.g., path exists but no numeric data)
+                     logger.warning(f"  Path '{full_path}': Missing median value in current ({current_median}) or calibrated ({calib_stat.get('median_value')}) stats. Skipping comparison.")
+            else:
+                # Handle missing data (path exists in calibrated but not current, or vice-versa)
+                # Apply a penalty? For now, log and contribute 0.
+                if not current_stat:
+                    logger.debug("  Path '%s': No current data/stats found for this path (present in calibrated).", full_path)
+                    # TODO: Apply penalty for missing current data
+                if not calib_stat: # Should not happen based on loop, but check defensively
+                     logger.warning(f"Path '{full_path}' present in loop but missing in calibrated_stats dict? Should not happen.")
+        return current_medians
+
+    @staticmethod
+    def _fingerprint_id(fingerprint: Dict[str, Any]) -> Optional[str]:
+        """
+        Returns an identifier for a generated fingerprint: its type and the end of its generation window.
+        Together with the inference configuration this is enough to regenerate it from raw_data.
+        """
+        if fingerprint.get('id'):
+            return fingerprint['id']
+        ended_at = fingerprint.get('generation_params', {}).get('ended_at') or fingerprint.get('created_at')
+        return f"{fingerprint.get('type')}@{ended_at}"
+
     def _convert_result_to_data_points(self, inference_result: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Converts a structured inference result into a list of data_point objects for logging.
@@ -485,7 +905,7 @@ class InferenceModule:
             A list of data_point objects.
         """
         output_data_points: List[Dict[str, Any]] = []
-        created_at = inference_result.get('created_at', datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'))
+        created_at = inference_result.get('created_at') or _now_iso_z()
         inference_name = inference_result.get('inference_name', 'unknown_inference')
         inference_type = inference_result.get('inference_type', 'unknown_type') # Get inference_type from the result
 
@@ -512,13 +932,19 @@ class InferenceModule:
         })
 
 
-        # Log the full structured result (to inference_data)
-        # The value will be the entire inference_result dictionary
+        # Log the structured result (to inference_data)
+        # The current fingerprint is replaced by its id: it can hold thousands of statistics paths
+        # and would otherwise dominate the size of every logged result
+        logged_result = inference_result
+        current_fingerprint = inference_result.get('fingerprint')
+        if isinstance(current_fingerprint, dict):
+            logged_result = {k: v for k, v in inference_result.items() if k != 'fingerprint'}
+            logged_result['fingerprint_id'] = self._fingerprint_id(current_fingerprint)
         output_data_points.append({
             'created_at': created_at,
             'type': f'inference.{inference_type}.result', # Use the correct inference_type
             'key': inference_name, # Key is the inference config name
-            'value': inference_result # The full structured result
+            'value': logged_result # The structured result, fingerprint referenced by id
         })
 
 
@@ -561,8 +987,8 @@ if __name__ == '__main__':
     dummy_inference_config = {
         'name': 'location_inference_config',
         'inference_type': 'location',
-        'created_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-        'updated_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'created_at': _now_iso_z(),
+        'updated_at': _now_iso_z(),
         'data_point_types': ['android.sensor.pressure', 'android.sensor.wifi_scan.rssi'],
         'included_paths': ['android.sensor.pressure', 'android.sensor.wifi_scan.rssi'], # Keep included_paths for inference config
         'sensor_weights': {'android.sensor.pressure': 0.6, 'android.sensor.wifi_scan.rssi': 0.4},
@@ -579,13 +1005,13 @@ if __name__ == '__main__':
     # Create a dummy calibrated fingerprint for comparison
     dummy_calibrated_fingerprint = {
         'type': 'location.kitchen',
-        'created_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-        'updated_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'created_at': _now_iso_z(),
+        'updated_at': _now_iso_z(),
         'inference_ref': 'location_inference_config',
         'generation_params': {
              'data_point_types': ['android.sensor.pressure', 'android.sensor.wifi_scan.rssi'],
-             'started_at': (datetime.now(timezone.utc) - timedelta(minutes=10)).isoformat().replace('+00:00', 'Z'),
-             'ended_at': (datetime.now(timezone.utc) - timedelta(minutes=9)).isoformat().replace('+00:00', 'Z'),
+             'started_at': _iso_z(datetime.now(timezone.utc) - timedelta(minutes=10)),
+             'ended_at': _iso_z(datetime.now(timezone.utc) - timedelta(minutes=9)),
         },
         'raw_data_ref': 'dummy_compressed_data_ref',
         'statistics': {
@@ -600,21 +1026,27 @@ if __name__ == '__main__':
 
 
     # Create a dummy list of current data points (simulating a real-time window)
-    current_time_str = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-    past_time_str = (datetime.now(timezone.utc) - timedelta(seconds=5)).isoformat().replace('+00:00', 'Z')
+    current_time_str = _now_iso_z()
+    past_time_str = _iso_z(datetime.now(timezone.utc) - timedelta(seconds=5))
+
+    dummy_rssi_readings = [
+        ('fa:8f:ca:55:8f:f1', -71.0),
+        ('other:network', -85.0),
+        # Add other (bssid, rssi) readings here
+    ]
 
+    # Slotted DataPoint rows instead of per-row dicts
     dummy_current_data_points = [
-        {'created_at': past_time_str, 'type': 'android.sensor.pressure', 'key': None, 'value': 1012.1},
-        {'created_at': past_time_str, 'type': 'android.sensor.wifi_scan.rssi', 'key': 'fa:8f:ca:55:8f:f1', 'value': -71.0},
-        {'created_at': past_time_str, 'type': 'android.sensor.wifi_scan.rssi', 'key': 'other:network', 'value': -85.0},
+        DataPoint(past_time_str, 'android.sensor.pressure', None, 1012.1),
+        *(DataPoint(past_time_str, _TYPE_WIFI_RSSI, bssid, rssi) for bssid, rssi in dummy_rssi_readings),
         # Add other relevant data points here
     ]
     logger.info(f"Created dummy current data points ({len(dummy_current_data_points)}).")
 
     # --- FIX: Write dummy current data points to DataStore before running inference ---
     logger.info("Writing dummy current data points to DataStore...")
-    for dp in dummy_current_data_points:
-        dummy_data_store.set_data(dp, files=['raw_data'])
+    # One batched call: validated together and queued under a single buffer lock
+    dummy_data_store.set_many(dummy_current_data_points, files=['raw_data'])
     # --- End FIX ---
 
 
@@ -630,6 +1062,6 @@ if __name__ == '__main__':
     )
 
     print(f"\nInference run completed. Generated {len(inference_output_points)} output data points:")
-    for dp in inference_output_points:
-        print(dp)
+    # One joined write instead of a print() (and stdout lock) per data point
+    sys.stdout.write(''.join(f"{dp}\n" for dp in inference_output_points))
 
@@ -0,0 +1,68 @@
+"""
+Compiled numeric kernels of the InferenceModule.
+
+They live apart from inference.py because Numba's on-disk cache (cache=True) is invalidated
+whenever the kernel's source file changes: kept here, edits to the rest of the module do not
+cost a recompile on the next start.
+"""
+from typing import Tuple
+import numpy as np
+
+# Numba is optional: it compiles the path scoring kernel; the NumPy kernel is used without it
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def score_paths_numpy(
+    current_medians: np.ndarray,
+    calib_medians: np.ndarray,
+    calib_stddevs: np.ndarray,
+    weights: np.ndarray,
+    min_stddevs: np.ndarray,
+    score_scale: float = 0.0
+) -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Scores aligned per-path statistics: |current - calibrated| / max(calib_stddev, min_stddev) * weight.
+    Paths with a NaN median (nothing to compare) contribute 0.
+
+    If score_scale > 0, scoring stops at the first path where total_score * score_scale >= 1, i.e. once
+    the confidence is pinned at 0. Only the scored paths' metrics are returned then.
+
+    Returns:
+        (total_score, unweighted_metrics, weighted_contributions)
+    """
+    unweighted_metrics = np.abs(current_medians - calib_medians) / np.maximum(calib_stddevs, min_stddevs)
+    unweighted_metrics[np.isnan(unweighted_metrics)] = 0.0
+    weighted_contributions = unweighted_metrics * weights
+    if score_scale > 0.0:
+        crossed = np.flatnonzero(np.cumsum(weighted_contributions) * score_scale >= 1.0)
+        if crossed.size:
+            n = int(crossed[0]) + 1
+            unweighted_metrics, weighted_contributions = unweighted_metrics[:n], weighted_contributions[:n]
+    return float(weighted_contributions.sum()), unweighted_metrics, weighted_contributions
+
+
+if njit is not None:
+    # No 'nnan' in fastmath: the kernel relies on NaN checks for paths without a comparison
+    # nogil: targets are scored concurrently on InferenceModule's thread pool
+    @njit(cache=True, nogil=True, fastmath={'reassoc', 'contract', 'arcp'})
+    def score_paths(current_medians, calib_medians, calib_stddevs, weights, min_stddevs, score_scale=0.0):
+        """Numba-compiled score_paths_numpy: one fused loop over the paths, left as soon as the confidence hits 0."""
+        n = len(weights)
+        unweighted_metrics = np.empty(n)
+        weighted_contributions = np.empty(n)
+        total_score = 0.0
+        for i in range(n):
+            metric = abs(current_medians[i] - calib_medians[i]) / max(calib_stddevs[i], min_stddevs[i])
+            if np.isnan(metric):
+                metric = 0.0
+            unweighted_metrics[i] = metric
+            weighted_contributions[i] = metric * weights[i]
+            total_score += weighted_contributions[i]
+            if score_scale > 0.0 and total_score * score_scale >= 1.0:
+                return total_score, unweighted_metrics[:i + 1], weighted_contributions[:i + 1]
+        return total_score, unweighted_metrics, weighted_contributions
+else:
+    score_paths = score_paths_numpy
@@ -1,21 +1,63 @@
 #!/usr/bin/env python3
 
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
 from flask import Flask, render_template, request, redirect, url_for, jsonify, Response
 import threading
 import asyncio
-import copy
 from datetime import datetime, timedelta, timezone
+import hashlib
 import json
+import mmap
 import os
 import time
 import websockets # Import websockets for the WSS server
 import aiohttp # Import aiohttp for the HTTP client (if needed for discovery, or remove if not)
 from aiohttp import web # Specific import for aiohttp web components
 from urllib.parse import urlencode # Needed for URL encoding
-from collections import deque # Added for efficiently reading last N lines
+from collections import deque, OrderedDict # Added for efficiently reading last N lines
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import partial
+from itertools import islice
+from operator import itemgetter
+import uuid
 import re # Added for regular expression operations
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
+from dataclasses import dataclass
+
+# orjson is optional: when installed, it encodes/decodes all JSON requests and responses
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    orjson = None
+
+# msgspec is optional: when installed, inference configuration request bodies are decoded by it
+# and their required fields type-checked in the same pass, before they reach the InferenceModule
+try:
+    import msgspec
+
+    class InferenceConfigIn(msgspec.Struct, frozen=True):
+        """Required fields of an inference configuration request body; other fields are kept as sent."""
+        name: str
+        inference_type: str
+        included_paths: List[str]
+        sensor_weights: Dict[str, float]
+
+    _config_body_decoder = msgspec.json.Decoder()
+except ImportError:
+    msgspec = None
+
+# Hypercorn is optional: it serves the Flask app on the DeviceManager's event loop.
+# Without it the Flask development server is used.
+try:
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config as HypercornConfig
+    from hypercorn.app_wrappers import WSGIWrapper
+except ImportError:
+    hypercorn_serve = None
 
 # --- Import Core Modules ---
 # Assume these files are in the same directory or accessible via Python path
@@ -31,6 +73,25 @@ except ImportError as e:
     exit()
 
 
+def _iso_z(dt: datetime) -> str:
+    """Formats an aware UTC datetime as ISO 8601 with the 'Z' suffix, the timestamp format of every data point."""
+    return dt.isoformat().replace('+00:00', 'Z')
+
+# (epoch second, its 'YYYY-MM-DDTHH:MM:SS' UTC form) as last formatted by _now_iso_z
+_now_second_prefix: Tuple[Optional[int], str] = (None, '')
+
+def _now_iso_z() -> str:
+    """Returns the current UTC time as an ISO 8601 string with microseconds and the 'Z' suffix."""
+    global _now_second_prefix
+    seconds, nanoseconds = divmod(time.time_ns(), 1_000_000_000)
+    cached_seconds, prefix = _now_second_prefix
+    if cached_seconds != seconds:
+        # Date and time of day only change once a second, so they are formatted once per second
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))
+        _now_second_prefix = (seconds, prefix)
+    return f"{prefix}.{nanoseconds // 1000:06d}Z"
+
+
 # --- Configuration ---
 # TODO: Move to a config file or environment variables
 # Network server configuration (where the mobile app sends data)
@@ -48,9 +109,16 @@ DEVICE_MANAGER_FRONTEND_WS_PORT = 5001
 # Web server (Flask) configuration
 FLASK_HOST = '0.0.0.0'
 FLASK_PORT = 5000
+# Werkzeug debugger for the fallback development server; off unless FLASK_DEBUG is set
+FLASK_DEBUG = os.getenv('FLASK_DEBUG', '0').lower() in ('1', 'true', 'yes')
 
 # Data storage configuration
 LOG_DIR = "data_logs" # Matches default in DataStore
+# Queued writes are flushed when this many points are buffered OR after this interval
+DATA_STORE_BATCH_SIZE = int(os.getenv('DATA_STORE_BATCH_SIZE', '500'))
+DATA_STORE_FLUSH_INTERVAL_MS = int(os.getenv('DATA_STORE_FLUSH_INTERVAL_MS', '100'))
+# fdatasync log files after every flushed batch (durable writes at the cost of flush latency)
+DATA_STORE_FSYNC = os.getenv('DATA_STORE_FSYNC', '0').lower() in ('1', 'true', 'yes')
 
 # Inference and Fingerprinting configuration directories (managed by modules)
 CONFIG_DIR = "configs"
@@ -67,6 +135,12 @@ server_log_path = os.path.join(LOG_DIR, "main_app.log") # ADDED: Define path usi
 os.makedirs(LOG_DIR, exist_ok=True) # ADDED: Ensure LOG_DIR exists
 server_log_handler = logging.FileHandler(server_log_path, mode='a') # Use the defined path
 server_log_handler.setFormatter(log_formatter)
+# Loggers only put records on this queue; the listener thread does the console and file writes,
+# so request and ingest threads never block on log I/O
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s')) # The listener's handlers add the prefix
+log_listener = QueueListener(log_queue, console_handler, server_log_handler, respect_handler_level=True)
 
 # Silence some noisy libraries
 logging.getLogger("aiohttp.client").setLevel(logging.WARNING)
@@ -78,7 +152,13 @@ logging.getLogger("aiohttp.access").setLevel(logging.WARNING) # Silence aiohttp
 # Instantiate core modules
 # These should be instantiated once at the top level (when imported)
 
-data_store = DataStore(log_directory=LOG_DIR) # Removed log_queue argument
+data_store = DataStore(
+    log_directory=LOG_DIR,
+    batch_size=DATA_STORE_BATCH_SIZE,
+    flush_interval_ms=DATA_STORE_FLUSH_INTERVAL_MS,
+    fsync=DATA_STORE_FSYNC
+) # Removed log_queue argument
+INFERENCE_HISTORY_PATH = data_store._get_log_file_path("inference_data.log")
 collector = Collector(data_store=data_store)
 # Instantiate InferenceModule and FingerprintingModule, wiring them using setters
 # Note: We need to instantiate them before wiring
@@ -90,8 +170,18 @@ inference_module.set_fingerprinting_module(fingerprinting_module)
 fingerprinting_module.set_inference_module(inference_module)
 
 # --- Background Task Runner ---
+# uvloop (libuv-based event loop) is optional: when enabled and installed, every loop created by
+# run_asyncio_loop is a uvloop loop. Set SENSORSERVER_UVLOOP=0 to keep the stock asyncio loop.
+if os.getenv('SENSORSERVER_UVLOOP', '1').lower() in ('1', 'true', 'yes'):
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logging.info("Using uvloop event loop policy.")
+    except ImportError:
+        logging.info("uvloop not available (e.g. on Windows); using the default asyncio event loop.")
+
 def run_asyncio_loop(coroutine):
-    """Runs an asyncio coroutine in a new event loop."""
+    """Runs an asyncio coroutine in a new event loop (a uvloop loop if its policy is installed)."""
     # Create a new event loop for this thread
     loop = asyncio.new_event_loop()
     # Set this new loop as the current event loop for this thread
@@ -108,13 +198,62 @@ def run_asyncio_loop(coroutine):
         loop.close()
         logger.info("Asyncio loop finished.")
 
+async def serve_with_device_manager(device_manager: DeviceManager) -> None:
+    """
+    Serves the Flask app through Hypercorn alongside the DeviceManager on the current event loop.
+    Flask handlers run on the loop's thread pool, so API requests overlap with sensor ingest.
+    /state/stream is served on the loop itself: its clients stay connected indefinitely and would
+    otherwise each hold one of the pool's threads for as long as they do.
+    Returns (stopping the other) as soon as either server stops, e.g. on SIGINT/SIGTERM.
+    """
+    hypercorn_config = HypercornConfig()
+    hypercorn_config.bind = [f"{FLASK_HOST}:{FLASK_PORT}"]
+    hypercorn_config.workers = 1
+    loop = asyncio.get_running_loop()
+    flask_app = WSGIWrapper(app, hypercorn_config.wsgi_max_body_size)
+
+    def call_soon(func, *args):
+        """Runs a coroutine function on the loop from a Flask handler's thread and waits for it."""
+        return asyncio.run_coroutine_threadsafe(func(*args), loop).result()
+
+    async def asgi_app(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == '/state/stream':
+            await state_stream.serve_asgi(scope, receive, send)
+        else:
+            await flask_app(scope, receive, send, partial(loop.run_in_executor, None), call_soon)
+
+    servers = [
+        asyncio.ensure_future(device_manager.start()),
+        asyncio.ensure_future(hypercorn_serve(asgi_app, hypercorn_config, mode='asgi'))
+    ]
+    try:
+        await asyncio.wait(servers, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for server in servers:
+            server.cancel()
+        await asyncio.gather(*servers, return_exceptions=True)
+
 # --- Auto-Logging Background Task ---
-def _background_auto_logger(duration_seconds: int):
-    """Periodically fetches state and logs it to state_data.log."""
-    end_time = time.time() + duration_seconds
+# At most AUTO_LOGGERS_MAX auto-logging tasks run at once; further requests are rejected with 429.
+# A slot is taken by the request that starts a task and given back by the task when it ends.
+AUTO_LOGGERS_MAX = int(os.getenv('AUTO_LOGGERS_MAX', '4'))
+auto_logger_slots = threading.BoundedSemaphore(AUTO_LOGGERS_MAX)
+
+async def _background_auto_logger(duration_seconds: int):
+    """Periodically fetches state and logs it to state_data.log, as a task on the running event loop."""
+    try:
+        await _auto_log_state(duration_seconds)
+    finally:
+        auto_logger_slots.release()
+
+async def _auto_log_state(duration_seconds: int):
+    """Logs a state snapshot every second for duration_seconds (see _background_auto_logger)."""
+    loop = asyncio.get_running_loop()
+    end_time = loop.time() + duration_seconds
+    next_tick = loop.time()
     logger.info(f"Starting background state logging for {duration_seconds}s.")
     
-    while time.time() < end_time:
+    while loop.time() < end_time:
         try:
             # Fetch current state using the same logic as the /state/data endpoint
             # This avoids duplicating the state fetching logic
@@ -123,15 +262,16 @@ def _background_auto_logger(duration_seconds: int):
             
             # Re-implement state fetching logic directly here to avoid context issues
             now = datetime.now(timezone.utc)
-            iso_now = now.isoformat().replace('+00:00', 'Z')
-            medium_window_start = (now - timedelta(minutes=1)).isoformat().replace('+00:00', 'Z')
+            iso_now = _iso_z(now)
+            medium_window_start = _iso_z(now - timedelta(minutes=1))
             
-            latest_prediction_dps = data_store.get_data(
+            # get_data() blocks on the flusher and file reads, so it runs off the loop
+            latest_prediction_dps = await loop.run_in_executor(None, lambda: data_store.get_data(
                  types=['inference.location.prediction'], 
                  started_at=medium_window_start, 
                  ended_at=iso_now, 
                  limit=1
-            )
+            ))
             latest_prediction = latest_prediction_dps[0] if latest_prediction_dps else None
             
             # Simplified state for logging - adjust as needed
@@ -153,13 +293,45 @@ def _background_auto_logger(duration_seconds: int):
         except Exception as e:
             logger.error(f"Error during background state logging: {e}", exc_info=True)
             
-        # Wait for the next interval (e.g., every 1 second)
-        time.sleep(1.0)
+        # Wait for the next interval (every 1 second), on a fixed cadence however long this tick took
+        next_tick += 1.0
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
         
     logger.info(f"Finished background state logging after {duration_seconds}s.")
 
 # --- Flask App Setup ---
+if orjson is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        """Flask JSON provider backed by orjson, so jsonify() and request.json use its C encoder."""
+        OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+        def dumps(self, obj, **kwargs) -> str:
+            return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            # Build the body as bytes directly instead of going through a str
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(orjson.dumps(obj, default=self.default, option=self.OPTIONS), mimetype=self.mimetype)
+
 app = Flask(__name__, static_folder='../static')
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+# Routes match with or without a trailing slash instead of answering the other form with a redirect
+app.url_map.strict_slashes = False
+
+# --- Inference Job Executor ---
+# Inference runs are queued here instead of getting a thread each; their futures are kept by job id
+# (most recent INFERENCE_JOBS_MAX) so clients can poll /api/inference/jobs/<job_id> for the result.
+# Threads rather than processes: the DataStore's flusher and log indexes assume a single writer process,
+# and the scoring kernel and NumPy release the GIL, so one job per core still runs in parallel.
+INFERENCE_EXECUTOR_WORKERS = int(os.getenv('INFERENCE_EXECUTOR_WORKERS', str(os.cpu_count() or 2)))
+INFERENCE_JOBS_MAX = 256
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_EXECUTOR_WORKERS, thread_name_prefix="inf")
+inference_jobs: "OrderedDict[str, Future]" = OrderedDict()
+inference_jobs_lock = threading.Lock()
 
 # --- Helper function for background inference task ---
 # Place this somewhere before the Flask routes in main.py
@@ -181,11 +353,45 @@ def _run_inference_background(app_context, config_name, current_time_str, comple
                  logger.error(f"InferenceModule not found in app config for '{config_name}'")
                  if completion_callback:
                      completion_callback(success=False, config_name=config_name, result=None, error="InferenceModule not configured")
+                 raise RuntimeError("InferenceModule not configured")
         except Exception as e:
             logger.error(f"Error during background inference run for '{config_name}': {e}", exc_info=True)
             if completion_callback:
                 # Pass None for result on exception
                 completion_callback(success=False, config_name=config_name, result=None, error=str(e))
+            raise # Recorded on the job's future
+        return inference_result
+
+def _run_inference_batch_background(app_context, config_names, current_time_str, completion_callback):
+    """Runs several inference configurations in background with one shared data read; calls callback per configuration."""
+    with app_context:
+        logger = logging.getLogger(__name__)
+        inference_module = app.config.get('INFERENCE_MODULE')
+        if not inference_module:
+            logger.error(f"InferenceModule not found in app config for batch {config_names}")
+            raise RuntimeError("InferenceModule not configured")
+        try:
+            inference_results = inference_module.run_inference_batch(config_names, current_time_str)
+        except Exception as e:
+            logger.error(f"Error during background inference batch {config_names}: {e}", exc_info=True)
+            if completion_callback:
+                for config_name in config_names:
+                    completion_callback(success=False, config_name=config_name, result=None, error=str(e))
+            raise # Recorded on the job's future
+        logger.info(f"Background inference batch for {len(config_names)} configurations completed.")
+        if completion_callback:
+            for config_name, inference_result in inference_results.items():
+                completion_callback(success=True, config_name=config_name, result=inference_result, error=None)
+        return inference_results
+
+def _register_inference_job(future: Future) -> str:
+    """Keeps a queued inference job's future under a new job id (forgetting the oldest beyond INFERENCE_JOBS_MAX)."""
+    job_id = uuid.uuid4().hex
+    with inference_jobs_lock:
+        inference_jobs[job_id] = future
+        while len(inference_jobs) > INFERENCE_JOBS_MAX:
+            inference_jobs.popitem(last=False) # Forget the oldest job
+    return job_id
 
 # --- Callback function for WebSocket push ---
 def _inference_completion_notify(success: bool, config_name: str, result: Optional[Dict], error: Optional[str]):
@@ -210,6 +416,112 @@ def _inference_completion_notify(success: bool, config_name: str, result: Option
             logger.warning("DeviceManager instance not found. Cannot send WS notification.")
     except Exception as e:
         logger.error(f"Error sending inference result notification for {config_name}: {e}", exc_info=True)
+    if success and result:
+        state_stream.publish(config_name, {
+            "prediction": result.get('overall_prediction', {}).get('value'),
+            "confidence": result.get('overall_prediction', {}).get('confidence'),
+            "created_at": result.get('created_at'),
+        })
+
+# --- State stream (Server-Sent Events) ---
+class StateStream:
+    """
+    Latest prediction state per inference configuration, pushed to /state/stream clients as it changes.
+    Updates are coalesced: a slow client skips straight to the newest state instead of queueing every one.
+    """
+    KEEPALIVE_SECONDS = 15.0
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._state: Dict[str, Dict] = {}
+        self._version = 0
+        self._waiters: List[asyncio.Future] = [] # Of clients served on an event loop (events_async)
+
+    def publish(self, config_name: str, config_state: Dict) -> None:
+        """Records a configuration's new state and wakes every waiting client."""
+        with self._cond:
+            self._state = {**self._state, config_name: config_state} # Replaced, never mutated: clients hold snapshots
+            self._version += 1
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_resolve_waiter, waiter)
+
+    @staticmethod
+    def _message(state: Optional[Dict]) -> str:
+        if state is None:
+            return ": keep-alive\n\n" # SSE comment, keeps proxies from closing an idle stream
+        return f"data: {app.json.dumps(state)}\n\n"
+
+    def events(self):
+        """Yields SSE messages: the current state, then the whole state again after every change."""
+        version = -1
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._version != version, timeout=self.KEEPALIVE_SECONDS)
+                if self._version == version:
+                    state = None
+                else:
+                    version, state = self._version, self._state
+            yield self._message(state)
+
+    async def events_async(self):
+        """events() for a client served on the event loop: waits for changes without holding a thread."""
+        loop = asyncio.get_running_loop()
+        version = -1
+        while True:
+            with self._cond:
+                if self._version == version:
+                    waiter = loop.create_future()
+                    self._waiters.append(waiter)
+                else:
+                    waiter = None
+                    version, state = self._version, self._state
+            if waiter is not None:
+                try:
+                    await asyncio.wait_for(waiter, self.KEEPALIVE_SECONDS)
+                    continue
+                except asyncio.TimeoutError:
+                    state = None
+                finally:
+                    with self._cond:
+                        if waiter in self._waiters:
+                            self._waiters.remove(waiter)
+            yield self._message(state)
+
+    async def serve_asgi(self, scope, receive, send) -> None:
+        """Serves a /state/stream request as an ASGI app, until the client disconnects."""
+        if scope['method'] != 'GET':
+            await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET')]})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+
+        async def stream():
+            async for message in self.events_async():
+                await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+
+        async def wait_for_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        tasks = [asyncio.ensure_future(stream()), asyncio.ensure_future(wait_for_disconnect())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+def _resolve_waiter(waiter: asyncio.Future) -> None:
+    if not waiter.done(): # Cancelled if its client timed out or went away meanwhile
+        waiter.set_result(None)
+
+state_stream = StateStream()
 
 
 # --- Flask Routes ---
@@ -244,33 +556,87 @@ def inference_configs():
 
 # --- API Endpoints (Interacting with Core Modules) ---
 
-@app.route('/api/data', methods=['GET'])
+@dataclass(slots=True, frozen=True)
+class DataQuery:
+    """Parameters of an /api/data request, read from the query string in one pass."""
+    types: List[str]
+    started_at: Optional[str]
+    ended_at: Optional[str]
+    keys: Optional[List[str]]
+    files: Optional[List[str]]
+    format: Optional[str]
+
+    @classmethod
+    def from_args(cls, args) -> "DataQuery":
+        params = args.to_dict(flat=False) # One walk over the MultiDict: name -> all its values
+        first = lambda name: params[name][0] if name in params else None
+        return cls(
+            types=params.get('types', []),
+            started_at=first('started_at'),
+            ended_at=first('ended_at'),
+            keys=params.get('keys') or None, # Use None if list is empty
+            files=params.get('files') or None, # Use None if list is empty
+            format=first('format'),
+        )
+
+@app.route('/api/data', methods=['GET'], provide_automatic_options=False) # Polled by the dashboard; never preflighted
 def api_get_data():
     """API endpoint to fetch data points from the DataStore."""
-    types = request.args.getlist('types')
-    started_at = request.args.get('started_at')
-    ended_at = request.args.get('ended_at')
-    keys = request.args.getlist('keys') or None # Use None if list is empty
-    files = request.args.getlist('files') or None # Use None if list is empty
+    query = DataQuery.from_args(request.args)
+    types, started_at, ended_at, keys, files = query.types, query.started_at, query.ended_at, query.keys, query.files
 
-    if not types or not started_at or not ended_at:
+    if not (types and started_at and ended_at):
         return jsonify({"error": "Missing required parameters: types, started_at, ended_at"}), 400
+    unknown_files = [f for f in files or () if f not in data_store.FILE_MAP]
+    if unknown_files:
+        return jsonify({"error": f"Unknown files: {', '.join(unknown_files)}"}), 400
 
     try:
+        # NDJSON clients get the matching log lines exactly as stored, streamed without being decoded
+        # and re-encoded. Without a keys filter the log index alone decides which lines match.
+        if keys is None and (query.format == 'ndjson'
+                             or request.accept_mimetypes.best == 'application/x-ndjson'):
+            try:
+                ranges = data_store.get_data_ranges(types, started_at, ended_at, files)
+            except ValueError as e:
+                return jsonify({"error": f"Invalid timestamp: {e}"}), 400
+            return Response(data_store.read_ranges(ranges), mimetype='application/x-ndjson')
+
         data_points = data_store.get_data(types, started_at, ended_at, keys, files)
         return jsonify({"data_points": data_points}), 200
     except Exception as e:
         logger.error(f"Error fetching data from DataStore: {e}", exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+# Encoded bodies of the list endpoints, keyed by endpoint: (version of the listed data, body, ETag).
+# load_* already skip re-reading unchanged files; this also skips re-encoding unchanged lists.
+# The ETag is a hash of the body, so it stays valid for pollers across server restarts.
+_list_response_cache: Dict[str, Tuple[int, bytes, str]] = {}
+
+def _cached_list_response(cache_key: str, version: int, build_payload):
+    """
+    Returns a JSON response of build_payload(), encoded once per version of the data it lists.
+    Answers 304 Not Modified without a body when the request's If-None-Match has its ETag.
+    """
+    cached = _list_response_cache.get(cache_key)
+    if cached is None or cached[0] != version:
+        body = app.json.dumps(build_payload()).encode('utf-8')
+        cached = _list_response_cache[cache_key] = (version, body, hashlib.blake2b(body, digest_size=12).hexdigest())
+    if cached[2] in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(cached[1], status=200, mimetype='application/json')
+    response.set_etag(cached[2])
+    return response
+
 @app.route('/api/fingerprints', methods=['GET'])
 def api_get_fingerprints():
     """API endpoint to fetch calibrated fingerprints."""
     try:
-        calibrated_fps = fingerprinting_module.load_calibrated_fingerprints()
+        calibrated_fps = fingerprinting_module.load_calibrated_fingerprints() # Reloads (bumping the version) if changed on disk
         # Convert dictionary to a list of fingerprints for easier frontend handling
-        fingerprint_list = list(calibrated_fps.values())
-        return jsonify({"calibrated_fingerprints": fingerprint_list}), 200
+        return _cached_list_response('fingerprints', fingerprinting_module.get_version(),
+                                     lambda: {"calibrated_fingerprints": list(calibrated_fps.values())})
     except Exception as e:
         logger.error(f"Error fetching calibrated fingerprints: {e}", exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
@@ -334,30 +700,53 @@ def api_calibrate_fingerprint():
 def api_get_inference_configs():
     """API endpoint to fetch all inference configurations."""
     try:
-        configs = inference_module.load_inference_configurations()
+        configs = inference_module.load_inference_configurations() # Reloads (bumping the version) if changed on disk
         # Convert dictionary to a list of configs for easier frontend handling
-        config_list = list(configs.values())
-        return jsonify({"inference_configurations": config_list}), 200
+        return _cached_list_response('inference_configs', inference_module.get_version(),
+                                     lambda: {"inference_configurations": list(configs.values())})
     except Exception as e:
         logger.error(f"Error fetching inference configurations: {e}", exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+def _parse_inference_config_body() -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Decodes the request body as an inference configuration and checks its required fields.
+    The returned configuration is a fresh dict owned by the caller, so it is handed on without copying.
+
+    Returns:
+        (config, None) if the body is valid, (None, error message) otherwise.
+    """
+    if msgspec is not None:
+        try:
+            # The body is read once and not kept on the request; the decoded dict is the only copy
+            config = _config_body_decoder.decode(request.get_data(cache=False))
+            msgspec.convert(config, InferenceConfigIn) # Type-checks the required fields only
+        except msgspec.ValidationError as e:
+            return None, f"Invalid inference config: {e}"
+        except msgspec.DecodeError:
+            return None, "Invalid JSON"
+        return config, None
+
+    data = request.json
+    if not data:
+        return None, "Invalid JSON"
+    # Basic validation (more comprehensive validation is in InferenceModule)
+    if 'name' not in data or 'inference_type' not in data or 'included_paths' not in data or 'sensor_weights' not in data:
+        return None, "Missing required inference config parameters"
+    # No copy: the parsed body belongs to this request, and the InferenceModule only sets
+    # top-level timestamps on the dict it keeps
+    return data, None
+
 @app.route('/api/inference_configs', methods=['POST'])
 def api_save_inference_config():
     """API endpoint to save a new inference configuration."""
-    data = request.json
-    if not data or 'name' not in data:
-        return jsonify({"error": "Invalid JSON"}), 400
+    new_config, error = _parse_inference_config_body()
+    if error:
+        return jsonify({"error": error}), 400
 
-    config_name = data['name']
+    config_name = new_config['name']
 
     try:
-        # Basic validation (more comprehensive validation is in InferenceModule)
-        if 'inference_type' not in data or 'included_paths' not in data or 'sensor_weights' not in data:
-             return jsonify({"error": "Missing required inference config parameters"}), 400
-
-        # Create a copy to avoid modifying the request data directly
-        new_config = data.copy()
         inference_module.save_inference_configuration(new_config)
         return jsonify({"status": "saved", "config_name": config_name}), 201
     except ValueError as e: # Catch specific validation errors
@@ -370,21 +759,15 @@ def api_save_inference_config():
 @app.route('/api/inference_configs/<string:config_name>', methods=['PUT'])
 def api_update_inference_config(config_name):
     """API endpoint to update an existing inference configuration."""
-    data = request.json
-    if not data:
-        return jsonify({"error": "Invalid JSON"}), 400
+    updated_config, error = _parse_inference_config_body()
+    if error:
+        return jsonify({"error": error}), 400
 
     try:
-        # Basic validation (more comprehensive validation is in InferenceModule)
-        if 'inference_type' not in data or 'included_paths' not in data or 'sensor_weights' not in data:
-             return jsonify({"error": "Missing required inference config parameters"}), 400
-
         # Ensure the name in the data matches the URL parameter
-        if data.get('name') != config_name:
+        if updated_config.get('name') != config_name:
              return jsonify({"error": "Config name in body must match URL"}), 400
 
-        # Create a copy to avoid modifying the request data directly
-        updated_config = data.copy()
         inference_module.update_inference_configuration(config_name, updated_config)
         return jsonify({"status": "updated", "config_name": config_name}), 200
     except ValueError as e: # Catch specific validation errors
@@ -405,7 +788,7 @@ def api_run_inference(config_name):
          return jsonify({"error": "Inference module not configured on server (checked at start)"}), 500
     # --- End Moved Check ---
 
-    current_time_str = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    current_time_str = _now_iso_z()
     logger.info(f"Received request to run inference for '{config_name}' at {current_time_str}")
 
     try:
@@ -416,24 +799,59 @@ def api_run_inference(config_name):
         #     return jsonify({"error": "Inference module not configured on server"}), 500
         inference_module = app.config['INFERENCE_MODULE'] # Can access directly now
              
-        # Start inference in a background thread
-        inference_thread = threading.Thread(
-            target=_run_inference_background,
-            # Pass app context for the background thread
-            args=(app.app_context(), config_name, current_time_str, _inference_completion_notify),
-            name=f"InferenceThread-{config_name}",
-            daemon=True
+        # Queue inference on the executor (pass app context for the worker thread)
+        future = inference_executor.submit(
+            _run_inference_background, app.app_context(), config_name, current_time_str, _inference_completion_notify
         )
-        inference_thread.start()
+        job_id = _register_inference_job(future)
 
-        logger.info(f"Background inference thread started for '{config_name}'.")
+        logger.info(f"Inference job {job_id} queued for '{config_name}'.")
         # Return 202 Accepted immediately
-        return jsonify({"status": "inference run accepted", "config_name": config_name, "timestamp": current_time_str}), 202
+        return jsonify({"status": "inference run accepted", "config_name": config_name, "timestamp": current_time_str, "job_id": job_id}), 202
+    except Exception as e:
+        # This catches errors during job submission, not execution
+        logger.error(f"Error queueing inference job for '{config_name}': {e}", exc_info=True)
+        return jsonify({"error": "Failed to start inference task"}), 500
+
+@app.route('/api/inference/run', methods=['POST'])
+def api_run_inference_batch():
+    """
+    API endpoint to run several inference configurations (body: {"config_names": [...]}, default: all)
+    as one job. The configurations share a single read of their data window.
+    """
+    data = request.get_json(silent=True) or {}
+    config_names = data.get('config_names')
+    if config_names is None:
+        config_names = list(inference_module.load_inference_configurations())
+    elif not isinstance(config_names, list) or not all(isinstance(name, str) for name in config_names):
+        return jsonify({"error": "'config_names' must be a list of configuration names"}), 400
+
+    current_time_str = _now_iso_z()
+    try:
+        future = inference_executor.submit(
+            _run_inference_batch_background, app.app_context(), config_names, current_time_str, _inference_completion_notify
+        )
+        job_id = _register_inference_job(future)
+        logger.info(f"Inference batch job {job_id} queued for {config_names}.")
+        return jsonify({"status": "inference run accepted", "config_names": config_names, "timestamp": current_time_str, "job_id": job_id}), 202
     except Exception as e:
-        # This catches errors during thread *creation*, not execution
-        logger.error(f"Error starting inference thread for '{config_name}': {e}", exc_info=True)
+        logger.error(f"Error queueing inference batch job for {config_names}: {e}", exc_info=True)
         return jsonify({"error": "Failed to start inference task"}), 500
 
+@app.route('/api/inference/jobs/<string:job_id>', methods=['GET'])
+def api_get_inference_job(job_id):
+    """API endpoint to poll an inference job: 202 while it runs, then its result (or error)."""
+    with inference_jobs_lock:
+        future = inference_jobs.get(job_id)
+    if future is None:
+        return jsonify({"error": f"Unknown inference job '{job_id}'"}), 404
+    if not future.done():
+        return jsonify({"job_id": job_id, "status": "running"}), 202
+    error = future.exception()
+    if error is not None:
+        return jsonify({"job_id": job_id, "status": "failed", "error": str(error)}), 200
+    return jsonify({"job_id": job_id, "status": "completed", "result": future.result()}), 200
+
 @app.route('/api/inference/history/<string:config_name>', methods=['GET'])
 def api_get_inference_history(config_name):
     """API endpoint to fetch inference run history for a specific configuration."""
@@ -444,52 +862,38 @@ def api_get_inference_history(config_name):
         
         logger.info(f"Fetching last {count} inference history runs for config: {config_name}")
         
-        # Define the expected log file path
-        history_file_path = data_store._get_log_file_path("inference_data.log")
         run_history = []
 
-        if not os.path.exists(history_file_path):
-            logger.warning(f"Inference history file not found: {history_file_path}")
+        if not os.path.exists(INFERENCE_HISTORY_PATH):
+            logger.warning(f"Inference history file not found: {INFERENCE_HISTORY_PATH}")
             return jsonify({"runs": []}), 200 # Return empty list if file doesn't exist
 
-        # Read the log file efficiently (maybe need read_last_n_lines or similar)
-        # For simplicity, reading all lines and filtering - inefficient for large files!
-        # TODO: Optimize log reading for history (e.g., use read_last_n_lines and filter)
+        # We stored the full result with type inference.{type}.result and the config name as key.
+        # The log index locates the result lines, which are read newest first until `count` match.
+        # The results are only passed on, so they stay the JSON they are stored as: no decode/re-encode.
         relevant_lines = []
         try:
-            with open(history_file_path, 'r') as f:
-                 # Read lines in reverse to get recent ones first potentially?
-                 # Or use read_last_n_lines if available and reliable
-                 all_lines = f.readlines() # Inefficient for large files!
-                 for line in reversed(all_lines):
-                     if len(relevant_lines) >= count:
-                         break # Stop once we have enough matching runs
-                     try:
-                         data_point = json.loads(line)
-                         # We stored the full result with type inference.{type}.result
-                         # Check if the key matches the config name
-                         if data_point.get('key') == config_name and data_point.get('type', '').endswith('.result'):
-                             # The value of this data_point *is* the inference_result structure
-                             inference_result = data_point.get('value')
-                             if isinstance(inference_result, dict):
-                                 relevant_lines.append(inference_result)
-                             else:
-                                 logger.warning(f"Found matching history entry for {config_name} but value is not a dict: {type(inference_result)}")
-                                 
-                     except json.JSONDecodeError:
-                         continue # Skip non-JSON lines
-                     except Exception as e:
-                         logger.warning(f"Error processing history line: {e}")
-                         
+            result_types = [t for t in data_store.get_unique_values('type', files=['inference_data']) if t.endswith('.result')]
+            history_points = data_store.get_latest_data(types=result_types, keys=[config_name], files=['inference_data'],
+                                                        limit=count, raw_values=True) if result_types else []
+            for data_point in history_points:
+                 if not data_point['type'].endswith('.result'):
+                     continue # Type only shares a result type's prefix
+                 # The value of this data_point *is* the inference_result structure
+                 inference_result = data_point['value']
+                 if inference_result.lstrip().startswith(b'{'):
+                     relevant_lines.append(inference_result)
+                 else:
+                     logger.warning(f"Found matching history entry for {config_name} but value is not a dict: {inference_result[:40]!r}")
+
         except Exception as e:
-            logger.error(f"Error reading inference history file {history_file_path}: {e}", exc_info=True)
+            logger.error(f"Error reading inference history file {INFERENCE_HISTORY_PATH}: {e}", exc_info=True)
             return jsonify({"error": "Failed to read inference history"}), 500
-            
-        # The lines were added in reverse chronological order due to reversed(all_lines)
-        # No need to sort again if read in reverse.
-        # If read normally, sort here: relevant_lines.sort(key=lambda x: x.get('created_at', ''), reverse=True)
 
-        return jsonify({"runs": relevant_lines}), 200 # Return the found runs
+        # The runs were read newest first, so they are already in reverse chronological order
+
+        # Return the found runs, spliced into the response body as stored
+        return app.response_class(b'{"runs":[' + b','.join(relevant_lines) + b']}', status=200, mimetype='application/json')
 
     except ValueError:
         return jsonify({"error": "Invalid count parameter"}), 400
@@ -502,7 +906,7 @@ def api_get_inference_history(config_name):
 
 # --- Endpoints related to the old state/event/log system (Review/Keep/Remove) ---
 # Keep state/data as it's used by multiple pages
-@app.route('/state/data', methods=['GET'])
+@app.route('/state/data', methods=['GET'], provide_automatic_options=False) # Polled by the dashboard; never preflighted
 def get_state_data():
     # Combine relevant state information for the frontend
     logger.debug("Fetching state data for frontend...")
@@ -514,6 +918,16 @@ def get_state_data():
         return jsonify({"error": "Failed to fetch state data"}), 500
 
 
+@app.route('/state/stream', methods=['GET'])
+def get_state_stream():
+    """
+    Streams the prediction state as Server-Sent Events whenever an inference run completes.
+    Only reached under the Flask development server; Hypercorn serves this path with StateStream.serve_asgi.
+    """
+    return Response(state_stream.events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/submit_event', methods=['POST'])
 def submit_event():
     # Endpoint to manually log an event from the frontend
@@ -533,7 +947,7 @@ def submit_event():
                  "involved_sensor_paths": selected_sensors,
                  # Optionally include current state snapshot here
             },
-            "created_at": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+            "created_at": _now_iso_z()
         }
         
         # Log the event data point using the Collector/DataStore
@@ -559,16 +973,30 @@ def start_auto_event_logging():
         if duration <= 0 or duration > 300: # Add a reasonable upper limit (e.g., 5 minutes)
             raise ValueError("Duration must be positive and not excessive (e.g., <= 300s)")
 
-        # Start the background logging task in a separate thread
-        log_thread = threading.Thread(
-             target=_background_auto_logger, 
-             args=(duration,),
-             name=f"AutoLoggerThread-{duration}s",
-             daemon=True # Allow main app to exit even if thread runs
-        )
-        log_thread.start()
+        if not auto_logger_slots.acquire(blocking=False):
+            logger.warning(f"Rejected auto-logging request: {AUTO_LOGGERS_MAX} auto-logging tasks already running")
+            return jsonify({"error": "Too many auto-logging tasks running, try again later"}), 429
+
+        # Schedule the background logging task on the DeviceManager's event loop
+        try:
+            device_manager = app.config.get('DEVICE_MANAGER')
+            loop = getattr(device_manager, '_loop', None)
+            if loop is not None and loop.is_running():
+                asyncio.run_coroutine_threadsafe(_background_auto_logger(duration), loop)
+            else:
+                # No event loop running (e.g. the DeviceManager is not started): give the task a loop of its own
+                log_thread = threading.Thread(
+                     target=run_asyncio_loop, 
+                     args=(_background_auto_logger(duration),),
+                     name=f"AutoLoggerThread-{duration}s",
+                     daemon=True # Allow main app to exit even if thread runs
+                )
+                log_thread.start()
+        except Exception:
+            auto_logger_slots.release() # The task never started, so it won't give its slot back
+            raise
         
-        logger.info(f"Started background auto-logging thread for {duration} seconds.")
+        logger.info(f"Started background auto-logging task for {duration} seconds.")
         return jsonify({"status": "success", "message": f"Auto-logging initiated for {duration} seconds."}), 200
 
     except ValueError as e:
@@ -579,50 +1007,86 @@ def start_auto_event_logging():
         return jsonify({"error": "Internal server error starting auto-log"}), 500
 
 
-# --- Log Reading Helper ---
+# --- Log Reading Helpers ---
+def _loads_log_line(line):
+    """Parses a JSON log line (str or bytes), with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass # orjson rejects the NaN/Infinity literals stdlib json writes; let json.loads decide
+    return json.loads(line)
+
+# Timestamp at the start of a text log line (standard logging format: YYYY-MM-DD HH:MM:SS,ms),
+# captured as its date, time and milliseconds
+_LOG_TIMESTAMP_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}) (\d{2}:\d{2}:\d{2}),(\d{3})')
+
+def _log_entry_sort_key(content: str, log_entry) -> str:
+    """Returns the /logs/data sort key of a log line: its created_at if it is a JSON data_point, else its text timestamp."""
+    if log_entry is not None:
+        return log_entry.get('created_at', '0') # Default for sorting
+    # Try parsing as standard log format (e.g., YYYY-MM-DD HH:MM:SS,ms)
+    match = _LOG_TIMESTAMP_RE.match(content)
+    if match:
+        # Rearranged into the created_at format (ISO, microseconds, Z) so both compare as plain strings
+        date, time_of_day, millis = match.groups()
+        return f"{date}T{time_of_day}.{millis}000Z"
+    return '0' # Default if no timestamp found
+
+# Bytes at the end of a log that iter_lines_reverse asks the kernel to read ahead first; doubled each
+# time the walk moves past the region advised so far
+TAIL_READAHEAD = 1 << 16
+
+def _advise_willneed(log_map, start: int, end: int) -> None:
+    """Asks the kernel to read [start, end) of a mapped file in ahead of the page faults that would load it."""
+    if not isinstance(log_map, mmap.mmap) or not hasattr(mmap, 'MADV_WILLNEED'):
+        return # In-memory copy, or a platform without madvise
+    start -= start % mmap.PAGESIZE # madvise needs a page-aligned start
+    try:
+        log_map.madvise(mmap.MADV_WILLNEED, start, end - start)
+    except OSError:
+        pass # Only a hint
+
+def iter_lines_reverse(filepath):
+    """
+    Yields the lines of a file last to first, as bytes without their line ending.
+    The file is memory-mapped and searched backwards for newlines, so stopping early touches only its tail.
+    """
+    with open(filepath, 'rb') as f:
+        try:
+            log_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty or unmappable (e.g. special) file: walk an in-memory copy the same way
+            log_map = f.read()
+        try:
+            end = len(log_map)
+            if not end:
+                return
+            if log_map[end - 1:end] == b'\n':
+                end -= 1 # Nothing after the file's final newline
+            # The walk goes backwards, against the kernel's forward readahead, so the tail is advised explicitly
+            readahead = TAIL_READAHEAD
+            advised_from = len(log_map)
+            while end >= 0:
+                if end <= advised_from and advised_from > 0:
+                    next_from = max(0, advised_from - readahead)
+                    _advise_willneed(log_map, next_from, advised_from)
+                    advised_from = next_from
+                    readahead *= 2
+                start = log_map.rfind(b'\n', 0, end) + 1 # 0 for the first line
+                yield log_map[start:end]
+                end = start - 1
+        finally:
+            if isinstance(log_map, mmap.mmap):
+                log_map.close()
+
 def read_last_n_lines(filepath, n): 
     """Reads the last n lines of a file efficiently."""
     try:
-        with open(filepath, 'rb') as f:
-            # Use deque to efficiently keep track of last N lines
-            # Read in chunks to avoid loading huge files into memory
-            buffer_size = 1024 * 8 # 8KB buffer
-            f.seek(0, os.SEEK_END)
-            file_size = f.tell()
-            
-            lines_found = []
-            block = -1
-            last_block = b''
-            
-            while len(lines_found) < n and file_size > 0:
-                if file_size - buffer_size < 0: # Don't overshoot beginning
-                    buffer_size = file_size
-                    file_size = 0
-                else:
-                    file_size -= buffer_size
-                    
-                f.seek(file_size, os.SEEK_SET)
-                current_block = f.read(buffer_size)
-                
-                # Prepend the last block's start if it was cut mid-line
-                if last_block:
-                    current_block += last_block
-                    
-                # Split into lines
-                block_lines = current_block.splitlines(True) # Keep line endings
-                
-                # Check if first line is complete
-                if block_lines and not block_lines[0].endswith((b'\n', b'\r')):
-                    last_block = block_lines.pop(0) # Store incomplete line start
-                else:
-                    last_block = b'' # First line was complete
-
-                # Add lines found (in reverse order)
-                lines_found.extend(block_lines[::-1])
+        lines_found = list(islice(iter_lines_reverse(filepath), n))
+        # Decode and return last N lines in correct order
+        return [line.decode('utf-8', errors='ignore').strip() for line in reversed(lines_found)]
 
-            # Decode and return last N lines in correct order
-            return [line.decode('utf-8', errors='ignore').strip() for line in lines_found[:n][::-1]]
-            
     except FileNotFoundError:
         logger.warning(f"Log file not found: {filepath}")
         return []
@@ -631,6 +1095,23 @@ def read_last_n_lines(filepath, n):
         return []
 
 
+# Log files/keys shown by the log viewer for each log type (adjust paths/keys as needed)
+# Using keys that DataStore might use internally is ideal
+LOG_VIEWER_FILES = {
+     'raw': ['raw_data'],
+     'state': ['state_data'], 
+     'event': ['event_data'], 
+     'server': ['main_app'], # Just main app logs for simplicity now
+     'inference': ['inference_data', 'inference'], 
+     # Add other module log keys if DataStore manages them
+     'devicemanager': ['devicemanager'],
+     'collector': ['collector'],
+     'datastore': ['datastore'],
+     'fingerprinting': ['fingerprinting'],
+}
+# 'all' includes all defined categories
+LOG_VIEWER_FILES['all'] = sorted(set(k for keys in LOG_VIEWER_FILES.values() for k in keys))
+
 @app.route('/logs/data', methods=['GET'])
 def get_logs_data():
     # Endpoint to fetch historical log data for the log viewer
@@ -641,25 +1122,15 @@ def get_logs_data():
         count = int(count_str)
         if count <= 0: count = 200 # Default if invalid count
         
-        # Define log files/keys (adjust paths/keys as needed)
-        # Using keys that DataStore might use internally is ideal
-        log_map = {
-             'raw': ['raw_data'],
-             'state': ['state_data'], 
-             'event': ['event_data'], 
-             'server': ['main_app'], # Just main app logs for simplicity now
-             'inference': ['inference_data', 'inference'], 
-             # Add other module log keys if DataStore manages them
-             'devicemanager': ['devicemanager'],
-             'collector': ['collector'],
-             'datastore': ['datastore'],
-             'fingerprinting': ['fingerprinting'],
-        }
-        # 'all' includes all defined categories
-        all_keys = set(k for keys in log_map.values() for k in keys)
-        log_map['all'] = list(all_keys)
-        
-        files_to_query_keys = log_map.get(log_type, log_map['all'])
+        files_to_query_keys = LOG_VIEWER_FILES.get(log_type, LOG_VIEWER_FILES['all'])
+        # Lines of a single log are already in order, so only logs merged from several files are sorted
+        merge_files = len(files_to_query_keys) > 1
+
+        # One directory listing answers which logs exist, instead of a stat per log
+        try:
+            existing_log_names = {entry.name for entry in os.scandir(data_store.log_dir)}
+        except FileNotFoundError:
+            existing_log_names = set()
 
         all_log_entries = []
         for key in files_to_query_keys:
@@ -668,22 +1139,26 @@ def get_logs_data():
                  # This might need adjustment based on DataStore's actual behavior
                  log_file_path = data_store._get_log_file_path(f"{key}.log") 
                  
-                 if os.path.exists(log_file_path):
+                 if os.path.basename(log_file_path) in existing_log_names:
                      lines = read_last_n_lines(log_file_path, count) # Use helper
                      for line in lines:
                           content = line.strip()
                           if not content: continue
                           
-                          # Try parsing as JSON (likely data_point logs)
+                          # Try parsing as JSON (likely data_point logs); the parsed entry is kept for sorting
                           try:
-                              log_entry = json.loads(content)
+                              log_entry = _loads_log_line(content)
                               # Use the type from the data_point if available, else use file key
                               entry_type = log_entry.get('type', key) 
-                              # Re-serialize value for consistent content string
-                              all_log_entries.append({"type": entry_type, "content": json.dumps(log_entry)})
+                              # The line is already the entry's JSON, so it is sent as is instead of re-serialized
+                              log_item = {"type": entry_type, "content": content}
                           except json.JSONDecodeError:
                               # Treat as plain text log line
-                              all_log_entries.append({"type": key, "content": content})
+                              log_entry = None
+                              log_item = {"type": key, "content": content}
+                          # The sort key is computed once per entry, not once per comparison
+                          sort_key = _log_entry_sort_key(content, log_entry) if merge_files else None
+                          all_log_entries.append((sort_key, log_item))
                  else:
                      logger.debug(f"Log file path not found for key '{key}': {log_file_path}")
 
@@ -691,32 +1166,14 @@ def get_logs_data():
                  logger.warning(f"Could not process log file for key '{key}': {file_error}")
 
         # Sort combined logs by timestamp (best effort, requires parseable timestamp)
-        def get_timestamp(log_item):
-            try:
-                # Try parsing content as JSON data_point
-                dp = json.loads(log_item['content'])
-                return dp.get('created_at', '0') # Default for sorting
-            except:
-                # Try parsing as standard log format (e.g., YYYY-MM-DD HH:MM:SS,ms)
-                match = re.match(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})', log_item['content'])
-                if match:
-                    # Attempt to parse the extracted timestamp string
-                    try:
-                         # Convert to comparable format (ISO or timestamp)
-                         # This assumes a specific format, adjust regex and parsing as needed
-                         dt_obj = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S,%f')
-                         return dt_obj.isoformat() + 'Z' # Make ISO format
-                    except ValueError:
-                         return '0' # Parsing failed
-                return '0' # Default if no timestamp found
-
-        try: 
-            all_log_entries.sort(key=get_timestamp)
-        except Exception as sort_error:
-             logger.warning(f"Could not sort log entries by timestamp: {sort_error}")
+        if merge_files:
+            try: 
+                all_log_entries.sort(key=itemgetter(0))
+            except Exception as sort_error:
+                 logger.warning(f"Could not sort log entries by timestamp: {sort_error}")
 
         # Return the last 'count' entries from the combined & sorted list
-        limited_logs = all_log_entries[-count:]
+        limited_logs = [log_item for _, log_item in all_log_entries[-count:]]
 
         return jsonify({"logs": limited_logs})
 
@@ -726,13 +1183,30 @@ def get_logs_data():
         logger.error(f"Error fetching logs data: {e}", exc_info=True)
         return jsonify({"error": "Internal server error fetching logs"}), 500
 
+# Devices found in the raw log with their last log timestamps: (expires_at, ip -> last_log).
+# Scanning the log is shared by every poller for DEVICES_CACHE_TTL seconds; live status is merged per request.
+DEVICES_CACHE_TTL = float(os.getenv('DEVICES_CACHE_TTL', '2.0'))
+_logged_devices_cache: Optional[Tuple[float, Dict[str, Optional[str]]]] = None
+_logged_devices_lock = threading.Lock()
+
+def _get_logged_devices() -> Dict[str, Optional[str]]:
+    """Returns the device IPs in the raw log mapped to their last log timestamp, rescanned at most once per TTL."""
+    global _logged_devices_cache
+    with _logged_devices_lock: # Concurrent pollers wait for one scan instead of each running their own
+        cached = _logged_devices_cache
+        if cached is None or cached[0] <= time.monotonic():
+            unique_ips = data_store.get_unique_values(field_name='device', files=['raw_data'])
+            logger.info(f"Found unique device IPs in logs: {unique_ips}")
+            last_logs = data_store.get_last_log_timestamps_by_device(unique_ips, file_key='raw_data')
+            cached = _logged_devices_cache = (time.monotonic() + DEVICES_CACHE_TTL, last_logs)
+        return cached[1]
+
 @app.route('/api/devices', methods=['GET'])
 def api_get_devices():
     """API endpoint to fetch combined device info (from logs and live manager)."""
     devices_info = []
     try:
-        unique_ips = data_store.get_unique_values(field_name='device', files=['raw_data'])
-        logger.info(f"Found unique device IPs in logs: {unique_ips}")
+        logged_devices = _get_logged_devices()
         
         # Get the live DeviceManager instance (assuming it's stored in app.config)
         # This might return None if the DeviceManager hasn't started or isn't stored correctly
@@ -749,13 +1223,13 @@ def api_get_devices():
         else:
              logger.warning("DeviceManager instance not found in app config.")
              
-        for ip in unique_ips:
+        for ip, last_log in logged_devices.items():
             device_data = {
                 "ip": ip,
                 "name": None,
                 "model": None,
                 "status": "unknown", # Default status if not live
-                "last_log": data_store.get_last_log_timestamp_for_device(ip, file_key='raw_data')
+                "last_log": last_log
             }
             
             # Merge live info if available for this IP
@@ -779,7 +1253,9 @@ def api_get_devices():
 if __name__ == '__main__':
     # --- Setup Logging HERE ---
     logging.getLogger().handlers = [] # Clear any previous handlers
-    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), handlers=[console_handler, server_log_handler])
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), handlers=[queue_handler])
+    log_listener.start()
+    atexit.register(log_listener.stop) # Drains the queued records on exit
     logger = logging.getLogger(__name__) # Get logger after basicConfig
     # ---
     
@@ -799,16 +1275,6 @@ if __name__ == '__main__':
     app.config['DEVICE_MANAGER'] = device_manager
     logger.info(f"DEVICE_MANAGER added to app.config: {'DEVICE_MANAGER' in app.config}") # ADDED LOG
 
-    # Start the DeviceManager thread
-    device_manager_thread = threading.Thread(
-        target=run_asyncio_loop,
-        args=(device_manager.start(),), 
-        name="DeviceManagerThread",
-        daemon=True 
-    )
-    device_manager_thread.start()
-    logger.info("Device manager thread started.")
-
     # --- Store Modules in App Config --- 
     app.config['DATA_STORE'] = data_store # If needed by routes/bg tasks
     app.config['COLLECTOR'] = collector
@@ -818,5 +1284,20 @@ if __name__ == '__main__':
     logger.info(f"FINGERPRINTING_MODULE added to app.config: {'FINGERPRINTING_MODULE' in app.config}") # ADDED LOG
 
     logger.info("Core modules instantiated and wired.")
-    logger.info(f"Starting Flask web server on {FLASK_HOST}:{FLASK_PORT}...")
-    app.run(host=FLASK_HOST, port=FLASK_PORT, debug=True, use_reloader=False)
+    if hypercorn_serve is not None:
+        # One event loop in the main thread (so Hypercorn can install its signal handlers) drives both servers
+        logger.info(f"Starting DeviceManager and Hypercorn web server on {FLASK_HOST}:{FLASK_PORT}...")
+        run_asyncio_loop(serve_with_device_manager(device_manager))
+    else:
+        # Start the DeviceManager thread
+        device_manager_thread = threading.Thread(
+            target=run_asyncio_loop,
+            args=(device_manager.start(),), 
+            name="DeviceManagerThread",
+            daemon=True 
+        )
+        device_manager_thread.start()
+        logger.info("Device manager thread started.")
+
+        logger.info(f"Hypercorn not available; starting Flask development server on {FLASK_HOST}:{FLASK_PORT}...")
+        app.run(host=FLASK_HOST, port=FLASK_PORT, debug=FLASK_DEBUG, use_reloader=False)
@@ -0,0 +1,281 @@
+import json
+import os
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from data_store import DataStore
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+WINDOW = dict(started_at='2024-01-01T00:00:00Z', ended_at='2024-01-02T00:00:00Z')
+
+
+def _iso(seconds: float) -> str:
+    return (BASE + timedelta(seconds=seconds)).isoformat().replace('+00:00', 'Z')
+
+
+def _point(value, seconds, data_point_type='a', key='k'):
+    return {"type": data_point_type, "key": key, "value": value, "created_at": _iso(seconds)}
+
+
+def _values(data_points):
+    return [data_point['value'] for data_point in data_points]
+
+
+def _scan(log_paths, types, started_at, ended_at, keys=None, limit=None):
+    """get_data() as a plain scan of every line, without the index or the window cache."""
+    start_dt = datetime.fromisoformat(started_at.replace('Z', '+00:00'))
+    end_dt = datetime.fromisoformat(ended_at.replace('Z', '+00:00'))
+    found = []
+    for log_path in log_paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path) as f:
+            for line in f:
+                try:
+                    data_point = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(data_point, dict) or not all(p in data_point for p in ('created_at', 'type', 'value')):
+                    continue
+                if not isinstance(data_point['type'], str) or not any(data_point['type'].startswith(t) for t in types):
+                    continue
+                try:
+                    created_at = datetime.fromisoformat(data_point['created_at'].replace('Z', '+00:00'))
+                except (AttributeError, ValueError):
+                    continue
+                if created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                if not start_dt <= created_at <= end_dt:
+                    continue
+                if keys is not None and data_point.get('key') not in keys:
+                    continue
+                found.append(data_point)
+    return found[:limit] if limit else found
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    return str(tmp_path / "logs")
+
+
+@pytest.fixture
+def store(log_dir):
+    data_store = DataStore(log_directory=log_dir)
+    yield data_store
+    data_store.close()
+
+
+def test_set_then_get_data(store):
+    for value in range(5):
+        store.set(_point(value, value))
+    assert _values(store.get_data(types=['a'], **WINDOW)) == [0, 1, 2, 3, 4]
+    assert _values(store.get_data(types=['a'], started_at=_iso(1), ended_at=_iso(3))) == [1, 2, 3]
+
+
+def test_torn_tail_is_terminated_before_appending(log_dir):
+    os.makedirs(log_dir)
+    log_path = os.path.join(log_dir, DataStore.RAW_DATA_FILE_NAME)
+    with open(log_path, 'wb') as f:
+        # One good line, then a line torn mid-write (e.g. by a crash)
+        f.write(json.dumps(_point(1, 0)).encode() + b'\n{"type":"a","key":"k","val')
+
+    data_store = DataStore(log_directory=log_dir)
+    try:
+        for value in (10, 11, 12):
+            data_store.set(_point(value, value))
+        assert _values(data_store.get_data(types=['a'], **WINDOW)) == [1, 10, 11, 12]
+        index = data_store._get_index(log_path)
+        assert index.indexed_size == os.path.getsize(log_path)
+    finally:
+        data_store.close()
+
+    # The offsets saved to the index are the lines' real ones
+    data_store = DataStore(log_directory=log_dir, window_cache_ttl=0)
+    try:
+        assert _values(data_store.get_data(types=['a'], **WINDOW)) == [1, 10, 11, 12]
+    finally:
+        data_store.close()
+
+
+def test_batch_appended_past_indexed_size_is_reindexed(store, monkeypatch):
+    store.set(_point(0, 0))
+    store.flush()
+    log_path = store.FILE_MAP['raw_data']
+    append = store._append
+
+    def append_after_other_writer(filepath, data):
+        # Another process appends a line between the writer's catch-up and its own append
+        with open(filepath, 'ab') as f:
+            f.write(json.dumps(_point(1, 1)).encode() + b'\n')
+        return append(filepath, data)
+
+    monkeypatch.setattr(store, '_append', append_after_other_writer)
+    store.set(_point(2, 2))
+    store.flush()
+    monkeypatch.undo()
+    assert _values(store.get_data(types=['a'], **WINDOW)) == [0, 1, 2]
+    assert store._get_index(log_path).indexed_size == os.path.getsize(log_path)
+
+
+def test_catch_up_indexes_lines_appended_by_others(store):
+    store.set(_point(0, 0))
+    assert _values(store.get_data(types=['a'], **WINDOW)) == [0]
+    log_path = store.FILE_MAP['raw_data']
+    line = json.dumps(_point(2, 2)).encode() + b'\n'
+    with open(log_path, 'ab') as f:
+        f.write(json.dumps(_point(1, 1)).encode() + b'\n' + line[:10])
+    # The incomplete line is left until its writer finishes it
+    assert _values(store.get_data(types=['a'], started_at=_iso(0), ended_at=_iso(5))) == [0, 1]
+    with open(log_path, 'ab') as f:
+        f.write(line[10:])
+    assert _values(store.get_data(types=['a'], started_at=_iso(0), ended_at=_iso(6))) == [0, 1, 2]
+
+
+@pytest.mark.parametrize('damage', ['missing', 'torn_record', 'bad_types', 'stale'])
+def test_index_is_rebuilt_from_the_log(log_dir, damage):
+    data_store = DataStore(log_directory=log_dir)
+    for value in range(20):
+        data_store.set(_point(value, value, data_point_type=f"t{value % 3}"))
+    data_store.close()
+    log_path = os.path.join(log_dir, DataStore.RAW_DATA_FILE_NAME)
+    index_path = log_path + ".idx"
+    if damage == 'missing':
+        os.remove(index_path)
+        os.remove(log_path + ".idx.types")
+    elif damage == 'torn_record':
+        os.truncate(index_path, os.path.getsize(index_path) - 5)
+    elif damage == 'bad_types':
+        with open(log_path + ".idx.types", 'wb') as f:
+            f.write(b'not json\n')
+    elif damage == 'stale':
+        # The log was replaced by a shorter one
+        with open(log_path, 'w') as f:
+            f.write(json.dumps(_point(100, 0, data_point_type='t0')) + '\n')
+
+    data_store = DataStore(log_directory=log_dir, window_cache_ttl=0)
+    try:
+        for types in (['t0'], ['t1', 't2'], ['t']):
+            assert data_store.get_data(types=types, **WINDOW) == _scan([log_path], types, **WINDOW)
+        assert data_store._get_index(log_path).indexed_size == os.path.getsize(log_path)
+    finally:
+        data_store.close()
+
+
+@pytest.mark.parametrize('window_cache_ttl', [0, 60])
+def test_get_data_matches_a_full_scan(log_dir, window_cache_ttl):
+    rng = random.Random(7)
+    data_store = DataStore(log_directory=log_dir, window_cache_ttl=window_cache_ttl)
+    try:
+        types = ['accel.x', 'accel.y', 'gyro', 'inference.location.result']
+        for value in range(600):
+            data_point = _point(value, rng.uniform(0, 3600), rng.choice(types), rng.choice(['a', 'b', None]))
+            data_store.set(data_point, files=[rng.choice(['raw_data', 'inference_data'])])
+        data_store.flush()
+        # Lines that don't go through set(): unreadable, incomplete or with other timestamp forms
+        with open(data_store.FILE_MAP['raw_data'], 'a') as f:
+            f.write('not json\n')
+            f.write(json.dumps({"type": "accel.x", "key": "a", "value": -1}) + '\n')
+            f.write(json.dumps({"type": "accel.x", "key": "a", "value": -2, "created_at": "2024-01-01T00:10:00"}) + '\n')
+            f.write(json.dumps({"type": "accel.x", "key": "a", "value": -3, "created_at": "2024-01-01T02:10:00+02:00"}) + '\n')
+            f.write(json.dumps({"type": "accel.x", "key": "a", "value": -4, "created_at": "yesterday"}) + '\n')
+
+        log_paths = list(data_store.FILE_MAP.values())
+        queries = [dict(types=['accel'], started_at=_iso(0), ended_at=_iso(3600))]
+        for _ in range(40):
+            start = rng.uniform(-60, 3600)
+            queries.append(dict(
+                types=rng.sample(['accel', 'accel.x', 'gyro', 'inference', 'none'], rng.randint(1, 3)),
+                started_at=_iso(start),
+                ended_at=_iso(start + rng.uniform(0, 1800)),
+                keys=rng.choice([None, ['a'], ['a', 'b'], [None]]),
+                limit=rng.choice([None, 5]),
+            ))
+        for query in queries:
+            expected = _scan(log_paths, **query)
+            assert data_store.get_data(**query) == expected
+            assert data_store.get_data(**query) == expected # Served from the window cache when enabled
+            assert data_store.get_data(**query, files=['raw_data']) == _scan(log_paths[:1], **query)
+
+        # A write into a cached window drops it
+        query = queries[0]
+        data_store.get_data(**query)
+        data_store.set(_point(1000, 60, 'accel.x', 'a'))
+        assert data_store.get_data(**query) == _scan(log_paths, **query)
+    finally:
+        data_store.close()
+
+
+def test_futures_resolve_once_written(store):
+    futures = [store.set(_point(value, value)) for value in range(3)]
+    futures += store.set_many([_point(3, 3), "not a data point"])
+    futures.append(store.set_bytes(json.dumps(_point(4, 4)).encode()))
+    assert futures[4] is None
+    for future in futures[:4] + futures[5:]:
+        assert future.result(timeout=5) is None
+    with open(store.FILE_MAP['raw_data']) as f:
+        assert [json.loads(line)['value'] for line in f] == [0, 1, 2, 3, 4]
+
+
+def test_full_buffer_drops_the_oldest_point(log_dir, monkeypatch):
+    data_store = DataStore(log_directory=log_dir, buffer_size=2)
+    writing = threading.Event()
+    release = threading.Event()
+    write_batch = data_store._write_batch
+
+    def blocked_write_batch(batch):
+        writing.set()
+        release.wait(5)
+        write_batch(batch)
+
+    monkeypatch.setattr(data_store, '_write_batch', blocked_write_batch)
+    try:
+        first = data_store.set(_point(0, 0))
+        assert writing.wait(5) # The flusher holds the first point; the buffer is empty again
+        futures = [data_store.set(_point(value, value)) for value in (1, 2, 3)]
+        with pytest.raises(BufferError):
+            futures[0].result(timeout=0)
+        release.set()
+        assert [future.result(timeout=5) for future in futures[1:]] == [None, None]
+        assert first.result(timeout=0) is None
+        assert _values(data_store.get_data(types=['a'], **WINDOW)) == [0, 2, 3]
+    finally:
+        release.set()
+        data_store.close()
+
+
+def test_data_ranges_hold_the_matching_lines(store):
+    rng = random.Random(3)
+    for value in range(200):
+        store.set(_point(value, rng.uniform(0, 100), rng.choice(['a', 'b', 'c'])), files=[rng.choice(['raw_data', 'inference_data'])])
+    for types, started_at, ended_at in ((['a'], _iso(0), _iso(100)), (['a', 'c'], _iso(20), _iso(60)), (['d'], _iso(0), _iso(100))):
+        ranges = store.get_data_ranges(types, started_at, ended_at)
+        streamed = b''.join(DataStore.read_ranges(ranges, chunk_size=100))
+        lines = streamed.splitlines(keepends=True)
+        assert all(line.endswith(b'\n') for line in lines)
+        assert [json.loads(line) for line in lines] == store.get_data(types, started_at, ended_at)
+
+
+def test_cached_windows_are_not_shared_with_callers(store):
+    store.set({"type": "inference.location.result", "key": None, "value": {"scores": [1, 2]}, "created_at": _iso(0)})
+    query = dict(types=['inference'], **WINDOW)
+    expected = store.get_data(**query) # Cached from here on
+    assert expected[0]['value'] == {"scores": [1, 2]}
+    for _ in range(2):
+        data_points = store.get_data(**query)
+        assert data_points == [{"type": "inference.location.result", "key": None, "value": {"scores": [1, 2]}, "created_at": _iso(0)}]
+        data_points[0]['key'] = 'changed'
+        data_points[0]['value']['scores'].append(3)
+        expected[0]['value'] = None
+
+
+def test_only_registered_types_are_quantized(store):
+    store.set({"type": "android.sensor.wifi_scan.rssi", "key": "bssid", "value": -61.6, "created_at": _iso(0)})
+    store.set({"type": "android.sensor.wifi_scan.rssi", "key": "bssid", "value": -300, "created_at": _iso(1)})
+    store.set({"type": "android.sensor.pressure", "key": None, "value": 1013.2, "created_at": _iso(2)})
+    store.set({"type": "android.sensor.light", "key": None, "value": 0.1 + 0.2, "created_at": _iso(3)})
+    assert DataStore.value_dtype("android.sensor.wifi_scan.rssi") == "int8"
+    assert DataStore.value_dtype("android.sensor.pressure") == "float64"
+    assert _values(store.get_data(types=['android.sensor'], **WINDOW)) == [-62, -128, 1013.2, 0.1 + 0.2]
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from data_store import DataStore
+from fingerprinting import FingerprintingModule
+from inference import InferenceModule
+
+PRESSURE = 'android.sensor.pressure'
+ENDED_AT = '2024-01-01T12:00:00Z'
+
+
+@pytest.fixture
+def fingerprinting_module(tmp_path):
+    data_store = DataStore(log_directory=str(tmp_path / "logs"))
+    inference_module = InferenceModule(data_store, config_dir=str(tmp_path / "configs"))
+    fingerprinting_module = FingerprintingModule(data_store, storage_dir=str(tmp_path / "fingerprints"))
+    inference_module.set_fingerprinting_module(fingerprinting_module)
+    fingerprinting_module.set_inference_module(inference_module)
+    inference_module.save_inference_configuration({
+        'name': 'pressure',
+        'inference_type': 'location',
+        'data_point_types': [PRESSURE],
+        'included_paths': [PRESSURE],
+        'sensor_weights': {PRESSURE: 1.0},
+        'window_duration_seconds': 60,
+        'confidence_threshold': 0.1,
+        'significant_difference': 1.5,
+    })
+    yield fingerprinting_module
+    data_store.close()
+
+
+def test_statistics_keep_the_logged_precision(fingerprinting_module):
+    data_store = fingerprinting_module.data_store
+    values = [1013.1, 1013.2, 1013.25]
+    for second, value in enumerate(values):
+        data_store.set({'type': PRESSURE, 'key': None, 'value': value, 'created_at': f'2024-01-01T11:59:5{second}Z'})
+    data_store.flush()
+    with open(data_store.FILE_MAP['raw_data']) as f:
+        assert '"value":1013.2,' in f.read().replace(' ', '')
+
+    fingerprint = fingerprinting_module.generate_fingerprint('location.kitchen', 'pressure', ENDED_AT)
+    statistics = fingerprint['statistics'][PRESSURE]
+    assert statistics['median_value'] == 1013.2
+    assert statistics['std_dev_value'] == float(np.std(values))
+    assert statistics['num_samples'] == 3
+
+    # Saved to calibrated_fingerprints.json as logged
+    fingerprinting_module.save_calibrated_fingerprint(fingerprint)
+    with open(fingerprinting_module.calibrated_fingerprints_path) as f:
+        assert '"median_value":1013.2,' in f.read().replace(' ', '')
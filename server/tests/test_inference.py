@@ -0,0 +1,82 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from data_store import DataStore
+from fingerprinting import FingerprintingModule
+from inference import InferenceModule
+
+NOW = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+PRESSURE = 'android.sensor.pressure'
+RSSI = 'android.sensor.wifi_scan.rssi'
+
+
+def _iso(seconds_ago: float) -> str:
+    return (NOW - timedelta(seconds=seconds_ago)).isoformat().replace('+00:00', 'Z')
+
+
+def _without_run_times(value):
+    """The result with the wall-clock times of the run itself dropped."""
+    if isinstance(value, dict):
+        return {k: _without_run_times(v) for k, v in value.items() if k not in ('created_at', 'updated_at')}
+    if isinstance(value, list):
+        return [_without_run_times(v) for v in value]
+    return value
+
+
+def _configuration(name, data_point_types, window_duration_seconds):
+    return {
+        'name': name,
+        'inference_type': 'location',
+        'data_point_types': data_point_types,
+        'included_paths': data_point_types,
+        'sensor_weights': {data_point_type: 1.0 / len(data_point_types) for data_point_type in data_point_types},
+        'window_duration_seconds': window_duration_seconds,
+        'confidence_threshold': 0.1,
+        'significant_difference': 1.5,
+        'min_std_dev_rssi': 2.0,
+    }
+
+
+@pytest.fixture
+def inference_module(tmp_path):
+    data_store = DataStore(log_directory=str(tmp_path / "logs"))
+    inference_module = InferenceModule(data_store, config_dir=str(tmp_path / "configs"))
+    fingerprinting_module = FingerprintingModule(data_store, storage_dir=str(tmp_path / "fingerprints"))
+    inference_module.set_fingerprinting_module(fingerprinting_module)
+    fingerprinting_module.set_inference_module(inference_module)
+
+    for name, rssi, pressure in (('kitchen', -60, 1012.0), ('office', -80, 1011.0), ('garage', -50, 1013.0)):
+        statistics = {PRESSURE: {'median_value': pressure, 'std_dev_value': 0.2, 'num_samples': 10}}
+        for b in range(30):
+            statistics[f'{RSSI}.bssid{b}'] = {'median_value': rssi + b % 7, 'std_dev_value': 3.0, 'num_samples': 10}
+        fingerprinting_module.save_calibrated_fingerprint({'type': f'location.{name}', 'statistics': statistics})
+
+    rng = random.Random(5)
+    for _ in range(300):
+        data_store.set({'created_at': _iso(rng.uniform(0, 60)), 'type': PRESSURE, 'key': None, 'value': 1012.0 + rng.uniform(-0.5, 0.5)})
+        b = rng.randint(0, 35)
+        data_store.set({'created_at': _iso(rng.uniform(0, 60)), 'type': RSSI, 'key': f'bssid{b}', 'value': -60 + b % 7 + rng.randint(-3, 3)})
+    data_store.flush()
+    yield inference_module
+    data_store.close()
+
+
+def test_run_inference_batch_matches_separate_runs(inference_module):
+    configurations = [
+        _configuration('both', [PRESSURE, RSSI], 10),
+        _configuration('pressure', [PRESSURE], 45),
+        _configuration('rssi', [RSSI], 30),
+        _configuration('empty_window', [RSSI], 0),
+    ]
+    for configuration in configurations:
+        inference_module.save_inference_configuration(configuration)
+    names = [configuration['name'] for configuration in configurations] + ['missing']
+
+    current_time = _iso(0)
+    batch_results = inference_module.run_inference_batch(names, current_time)
+    assert list(batch_results) == names
+    for name in names:
+        assert _without_run_times(batch_results[name]) == _without_run_times(inference_module.run_inference(name, current_time))
+    assert batch_results['both']['comparisons']